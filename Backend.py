@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -9,19 +10,35 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 import csv
+import io
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 import os
-import random
 import logging
 from fake_useragent import UserAgent
 import colorlog
-import psycopg2
 from psycopg2 import sql
+from db import close_pool, get_connection, release_connection
+from migrations import migrate
 from selenium.common.exceptions import TimeoutException, WebDriverException
 import json
 import urllib.parse
+import argparse
+import queue
+import threading
+from scheduler import CrawlScheduler, HostRateLimiter
+from metrics import METRICS
+from profiling import PROFILE_DIR, SAMPLE_INTERVAL, CrawlProfiler
+from retry import (AccessBlockedError, CaptchaError, CircuitBreaker, CrawlError, FailedUrls, ShortHtmlError,
+                   TransientError, backoff_delay, retry_allowed)
+from html_cache import CACHE_DIR, CACHE_TTL, HtmlCache, page_type
+from spec_matcher import SPEC_FIELDS, SpecMatcher
+from browser_pool import BrowserPool, note_captcha
+from readiness import LEGACY_CLICK_PAUSE, count_matches, log_readiness_totals, wait_for_page_ready
+from page_extract import extract_catalog_cards, extract_spec_pairs
+from network import (RESOURCE_POLICY, apply_resource_policy, capture_json_responses, collect_page_network,
+                     log_network_totals, save_capture)
 
 # Настройка цветного логирования
 handler = colorlog.StreamHandler()
@@ -41,8 +58,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Базовый URL
-BASE_URL = "https://market.yandex.ru/catalog--smartfony/26893750/list?hid=91491&page="
+# Базовый URL; адрес площадки переопределяется, например, для локального стенда
+MARKET_ORIGIN = os.environ.get("PHONES_MARKET_ORIGIN", "https://market.yandex.ru").rstrip("/")
+BASE_URL = f"{MARKET_ORIGIN}/catalog--smartfony/26893750/list?hid=91491&page="
 
 # Список известных брендов
 KNOWN_BRANDS = {
@@ -51,15 +69,78 @@ KNOWN_BRANDS = {
     "infinix", "tecno", "asus", "zte", "nothing"
 }
 
-# Настройки подключения к PostgreSQL
-DB_CONFIG = {
-    "dbname": "Phones",
-    "user": "postgres",
-    "password": "12345",
-    "host": "localhost",
-    "port": "5432",
-    "client_encoding": "UTF8"
+# Настройки быстрой загрузки страниц товаров без браузера
+HTTP_TIMEOUT = 15
+HTTP_POOL_SIZE = 16
+HTTP_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
 }
+# Страница без браузера принимается, только если заполнено не меньше стольких полей
+# характеристик: серверная разметка часто содержит лишь краткий блок, а полный дает браузер
+FAST_PATH_MIN_FIELDS = 5
+
+# Запись в БД пачками: размер пачки и максимальный интервал между сбросами (с)
+DB_BATCH_SIZE = 50
+DB_FLUSH_INTERVAL = 30
+
+# Контрольная точка старше времени жизни страниц каталога не используется: каталог уже
+# изменился, и продолжение вчерашнего обхода пропустило бы первые страницы (с)
+CHECKPOINT_MAX_AGE = CACHE_TTL["catalog"]
+
+# История цен: контрольная запись без изменения цены раз в N дней, срок хранения
+# подробных данных и общий срок хранения помесячных секций
+PRICE_HISTORY_HEARTBEAT_DAYS = 7
+PRICE_HISTORY_RAW_MONTHS = 3
+PRICE_HISTORY_RETENTION_MONTHS = 24
+
+# Возраст характеристик, после которого инкрементальный режим загружает их заново
+SPEC_MAX_AGE_DAYS = 7
+
+# Количество заранее запущенных запасных браузеров. При предзагрузке каталога запасные
+# не держатся: браузер предзагрузки уже добавляет к основному и воркерам еще один Chrome
+BROWSER_SPARES = 1
+
+# Профиль браузеров обхода: без окна и с блокировкой картинок, медиа, шрифтов и трекеров
+HEADLESS = False
+BLOCK_RESOURCES = True
+NETWORK_STATS = True
+
+# Способ извлечения данных со страниц в браузере: dom — разбор HTML, network — перехват
+# JSON-ответов, js — сбор характеристик и карточек скриптом в самой странице
+EXTRACTION_MODES = ("dom", "network", "js")
+EXTRACTION_MODE = "dom"
+CAPTURE_DIR = None
+
+# Сколько страниц каталога загружать заранее отдельным браузером (0 — без предзагрузки)
+CATALOG_PREFETCH_DEPTH = 1
+
+# Метрики обхода: сводка JSON в конце запуска и, по желанию, файл для textfile collector Prometheus
+METRICS_SUMMARY = "crawl_metrics.json"
+METRICS_TEXTFILE = None
+
+# Профилировщик обхода (--profile): снимки памяти делаются после каждой страницы каталога
+PROFILER = None
+
+# Темп запросов к одному хосту: целевое число запросов в минуту, запас и разброс
+REQUESTS_PER_MINUTE = 20
+RATE_BURST = 2
+RATE_JITTER = 0.3
+CIRCUIT_BREAKER = CircuitBreaker()
+RATE_LIMITER = HostRateLimiter(REQUESTS_PER_MINUTE, RATE_BURST, RATE_JITTER, CIRCUIT_BREAKER)
+
+# Адреса, не загрузившиеся после всех попыток; товары с них повторяются в конце обхода
+FAILED_URLS = FailedUrls()
+
+# Парсер HTML для BeautifulSoup: lxml, если установлен, иначе html.parser
+PARSER_BACKENDS = ("lxml", "html.parser")
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
 
 # Селекторы для парсинга каталога
 PRODUCT_CARD_SELECTORS = [
@@ -90,6 +171,9 @@ PRICE_SELECTORS = [
     "span[data-auto='price-value']",
 ]
 
+# Заглушка пустой страницы после последней страницы каталога
+EMPTY_STATE_SELECTOR = "div[data-zone-name='emptyState']"
+
 # Селекторы для характеристик на странице товара
 SPEC_LIST_SELECTORS = [
     "div._23gJ9",
@@ -103,6 +187,15 @@ SPEC_LIST_SELECTORS = [
     "div[class*='product-characteristics']",
 ]
 
+# Строки характеристик: до клика по кнопке 'Все характеристики' на странице только их часть
+SPEC_ROW_SELECTORS = ["table tr, dl dt"]
+
+# Поиск встроенных JSON-данных в <script>
+JSON_SCRIPT_TYPES = {"application/json", "application/ld+json"}
+JSON_ASSIGNMENT_RE = re.compile(r"(?<![\w$.])(?:window\.|self\.)?[\w$.]*(?:__[A-Z_]+__|[Ss]tate|[Dd]ata|[Pp]rops)\s*=\s*(?=[{\[])")
+JSON_DECODER = json.JSONDecoder()
+SPEC_CONTAINER_KEYS = {"specifications", "specs", "productspecs", "props", "params", "additionalproperty"}
+
 # Маппинг русских названий характеристик на английские поля
 SPEC_MAPPING = {
     "диагональ": "screen_size",
@@ -126,11 +219,34 @@ SPEC_MAPPING = {
     "память": "storage",
     "внутренняя память": "storage",
 }
+SPEC_MATCHER = SpecMatcher(SPEC_MAPPING)
+
+_driver_path = None
+_user_agent = None
+_driver_lock = threading.Lock()
+
+
+def resolve_driver_path():
+    # Путь к chromedriver определяется один раз за процесс
+    global _driver_path
+    with _driver_lock:
+        if _driver_path is None:
+            _driver_path = os.environ.get("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+            logger.info(f"Используется chromedriver: {_driver_path}")
+        return _driver_path
+
+
+def random_user_agent():
+    global _user_agent
+    with _driver_lock:
+        if _user_agent is None:
+            _user_agent = UserAgent()
+        return _user_agent.random
+
 
 def setup_driver():
-    ua = UserAgent()
     chrome_options = Options()
-    chrome_options.add_argument(f"user-agent={ua.random}")
+    chrome_options.add_argument(f"user-agent={random_user_agent()}")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_argument("--no-sandbox")
@@ -141,8 +257,21 @@ def setup_driver():
     chrome_options.add_argument("--disable-extensions")
     chrome_options.add_argument("--start-maximized")
     chrome_options.add_argument("--ignore-certificate-errors")
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    if HEADLESS:
+        chrome_options.add_argument("--headless=new")
+    performance_log = NETWORK_STATS or EXTRACTION_MODE == "network"
+    if performance_log:
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    service = Service(resolve_driver_path())
+    with METRICS.timer("driver_startup"):
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.crawl_performance_log = performance_log
+    driver.crawl_network_stats = NETWORK_STATS
+    if performance_log:
+        driver.execute_cdp_cmd("Network.enable", {})
+    if BLOCK_RESOURCES:
+        patterns = apply_resource_policy(driver, RESOURCE_POLICY)
+        logger.debug(f"Заблокировано шаблонов URL: {len(patterns)}")
     driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
         "source": """
             Object.defineProperty(navigator, 'webdriver', {
@@ -210,7 +339,7 @@ def dismiss_login_popup(driver):
         body = driver.find_element(By.TAG_NAME, "body")
         driver.execute_script("arguments[0].click();", body)
         logger.info("Баннер авторизации закрыт кликом по body")
-        time.sleep(random.uniform(1, 2))
+        WebDriverWait(driver, 2).until(EC.invisibility_of_element(popup))
     except TimeoutException:
         logger.debug("Баннер авторизации не найден")
 
@@ -237,72 +366,109 @@ def hide_login_banner(driver):
         logger.warning(f"Ошибка при скрытии баннеров: {str(e)}")
 
 
-def scroll_page(driver):
+def scroll_page(driver, selectors):
     try:
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollBy(0, 500);")
-            time.sleep(random.uniform(1, 2))
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
+        wait_for_page_ready(driver, selectors, scroll=True)
         logger.info("Прокрутка страницы завершена")
     except Exception as e:
         logger.warning(f"Ошибка при прокрутке страницы: {str(e)}")
 
 
-def get_html(url, driver, retries=3):
+def catalog_ended(driver):
+    try:
+        return bool(driver.find_elements(By.CSS_SELECTOR, EMPTY_STATE_SELECTOR))
+    except WebDriverException:
+        return False
+
+
+def access_denied_text(driver, want_html):
+    if want_html:
+        return "доступ к сайту" in driver.page_source.lower()
+    return driver.execute_script(
+        "return document.documentElement.outerHTML.toLowerCase().indexOf('доступ к сайту') !== -1;")
+
+
+def get_html(url, driver, retries=3, want_html=True):
+    failures = {}
     for attempt in range(retries):
         try:
+            RATE_LIMITER.acquire(url)
             logger.info(f"Загружаем (попытка {attempt + 1}): {url}")
-            driver.get(url)
-            dismiss_login_popup(driver)
-            hide_login_banner(driver)
+            with METRICS.timer("page_load"):
+                driver.get(url)
+            with METRICS.timer("popup_dismiss"):
+                dismiss_login_popup(driver)
+                hide_login_banner(driver)
 
             if "showcaptcha" in driver.current_url.lower() or "Капча" in driver.title:
-                logger.warning("Обнаружена капча! Перезагружаем страницу...")
-                time.sleep(random.uniform(1, 3))
-                driver.refresh()
+                note_captcha(driver)
+                raise CaptchaError("Обнаружена капча")
 
             if "catalog" in url.lower():
+                ready_selectors = PRODUCT_CARD_SELECTORS
                 wait_condition = lambda d: any(d.find_elements(By.CSS_SELECTOR, sel) for sel in PRODUCT_CARD_SELECTORS) or \
-                    d.find_elements(By.CSS_SELECTOR, "div[data-zone-name='emptyState']")
+                    d.find_elements(By.CSS_SELECTOR, EMPTY_STATE_SELECTOR)
             else:
+                ready_selectors = SPEC_LIST_SELECTORS
                 wait_condition = lambda d: any(d.find_elements(By.CSS_SELECTOR, sel) for sel in SPEC_LIST_SELECTORS)
 
-            WebDriverWait(driver, 30).until(wait_condition)
-
-            empty_state = driver.find_elements(By.CSS_SELECTOR, "div[data-zone-name='emptyState']")
-            if empty_state:
+            try:
+                with METRICS.timer("content_wait"):
+                    WebDriverWait(driver, 30).until(wait_condition)
+            except TimeoutException:
+                if "Доступ ограничен" in driver.title or access_denied_text(driver, want_html):
+                    raise AccessBlockedError("Доступ к сайту ограничен")
+                raise
+
+            if catalog_ended(driver):
                 logger.info("Пустая страница - конец каталога")
+                CIRCUIT_BREAKER.record(url)
+                FAILED_URLS.discard(url)
                 return None
 
-            if "Доступ ограничен" in driver.title or "доступ к сайту" in driver.page_source.lower():
-                logger.error("Доступ к сайту ограничен")
-                raise Exception("Доступ к сайту ограничен")
+            if "Доступ ограничен" in driver.title or access_denied_text(driver, want_html):
+                raise AccessBlockedError("Доступ к сайту ограничен")
 
-            scroll_page(driver)
-            html = driver.page_source
-
-            if len(html) < 5000:
-                logger.warning("Слишком короткий HTML-код страницы")
-                raise Exception("Слишком короткий HTML-код страницы")
-
-            logger.info(f"HTML загружен, длина: {len(html)} символов")
+            with METRICS.timer("scroll"):
+                scroll_page(driver, ready_selectors)
+            with METRICS.timer("page_source"):
+                if want_html:
+                    html = driver.page_source
+                    length = len(html)
+                else:
+                    # Документ остается в браузере, передается только его длина
+                    html = True
+                    length = driver.execute_script("return document.documentElement.outerHTML.length;")
+
+            if length < 5000:
+                raise ShortHtmlError("Слишком короткий HTML-код страницы")
+
+            logger.info(f"HTML загружен, длина: {length} символов")
+            METRICS.inc("pages_total", source="browser", kind=page_type(url))
+            METRICS.inc("html_bytes_total", length)
+            CIRCUIT_BREAKER.record(url)
+            FAILED_URLS.discard(url)
             return html
-        except (TimeoutException, WebDriverException) as e:
-            logger.error(f"Ошибка при загрузке {url} (попытка {attempt + 1}): {str(e)[:200]}")
-            if attempt == retries - 1:
-                logger.error("Все попытки исчерпаны")
-                try:
-                    with open(f"error_page_{url.split('=')[-1]}_{attempt}.html", "w", encoding="utf-8") as f:
-                        f.write(driver.page_source)
-                    logger.info(f"Сохранен HTML ошибки в error_page_{url.split('=')[-1]}_{attempt}.html")
-                except Exception as save_e:
-                    logger.error(f"Ошибка при сохранении HTML ошибки: {save_e}")
-                return None
-            time.sleep(random.uniform(5, 10))
+        except (CrawlError, TimeoutException, WebDriverException) as e:
+            kind = e.kind if isinstance(e, CrawlError) else TransientError.kind
+            failures[kind] = failures.get(kind, 0) + 1
+            METRICS.inc("failures_total", kind=kind)
+            CIRCUIT_BREAKER.record(url, kind)
+            logger.error(f"Ошибка при загрузке {url} (попытка {attempt + 1}, {kind}): {str(e)[:200]}")
+            if attempt < retries - 1 and retry_allowed(kind, failures[kind]):
+                delay = backoff_delay(kind, failures[kind])
+                logger.info(f"Повтор через {delay:.1f} с")
+                time.sleep(delay)
+                continue
+            logger.error(f"Попытки исчерпаны ({kind}), адрес отложен для повторного прохода")
+            FAILED_URLS.add(url, kind)
+            try:
+                with open(f"error_page_{url.split('=')[-1]}_{attempt}.html", "w", encoding="utf-8") as f:
+                    f.write(driver.page_source)
+                logger.info(f"Сохранен HTML ошибки в error_page_{url.split('=')[-1]}_{attempt}.html")
+            except Exception as save_e:
+                logger.error(f"Ошибка при сохранении HTML ошибки: {save_e}")
+            return None
     return None
 
 
@@ -313,76 +479,183 @@ def click_full_specs_button(driver):
                 EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Все характеристики')]"))
             )
             driver.execute_script("arguments[0].scrollIntoView(true);", full_specs_button)
-            time.sleep(1)
+            rows_before = count_matches(driver, SPEC_ROW_SELECTORS)
             driver.execute_script("arguments[0].click();", full_specs_button)
             logger.info("Клик по кнопке 'Все характеристики'")
-            time.sleep(random.uniform(5, 8))
+            wait_for_page_ready(driver, SPEC_ROW_SELECTORS, scroll=False, legacy_pause=LEGACY_CLICK_PAUSE,
+                                min_cards=rows_before)
             return True
         except Exception as e:
             logger.debug(f"Попытка {attempt + 1} клика по кнопке 'Все характеристики' не удалась: {str(e)}")
     return False
 
 
-def extract_specs_from_json(html):
-    soup = BeautifulSoup(html, "html.parser")
-    scripts = soup.find_all("script")
-    specs = {}
-    for script in scripts:
-        if not script.string:
+def resolve_parser_backend(preferred):
+    if preferred == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            logger.warning("lxml не установлен, используется html.parser")
+            return "html.parser"
+    return preferred
+
+
+def make_soup(html):
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def add_spec_pairs(value, specs):
+    if isinstance(value, list):
+        for item in value:
+            if isinstance(item, dict):
+                k = clean_text(str(item.get("name") or item.get("title") or item.get("key", ""))).lower()
+                v = item.get("value") or item.get("content") or item.get("val", "")
+                if isinstance(v, (dict, list)):
+                    continue
+                v = clean_text(str(v))
+                if k and v:
+                    specs[k] = v
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            if isinstance(v, (dict, list)) or v is None:
+                continue
+            k = clean_text(k).lower()
+            v = clean_text(str(v))
+            if k and v:
+                specs[k] = v
+
+
+def iter_json_islands(soup):
+    return iter_script_json((script.get("type") or "", script.string) for script in soup.find_all("script"))
+
+
+def iter_script_json(scripts):
+    # JSON из скриптов, заданных парами (тип, текст): из HTML или из скрипта в странице
+    for script_type, text in scripts:
+        if not text:
+            continue
+        script_type = script_type.lower()
+        start = len(text) - len(text.lstrip())
+        if script_type in JSON_SCRIPT_TYPES or text[start:start + 1] in ("{", "["):
+            try:
+                data, _ = JSON_DECODER.raw_decode(text, start)
+                yield data
+                continue
+            except ValueError:
+                pass
+        if script_type in JSON_SCRIPT_TYPES:
             continue
-        if any(keyword in script.string.lower() for keyword in [
-            "productspecs", "specifications", "productcard", "props", "collections", "spec", "params", "characteristics"
-        ]):
+        pos = 0
+        while True:
+            match = JSON_ASSIGNMENT_RE.search(text, pos)
+            if not match:
+                break
             try:
-                json_matches = re.finditer(r'({[^{}]*?(?:"specifications"|"props"|"collections"|"params")[^{}]*})', script.string, re.DOTALL)
-                for match in json_matches:
-                    data = json.loads(match.group(1))
-                    def extract_recursive(obj):
-                        if isinstance(obj, dict):
-                            for key, value in obj.items():
-                                if key.lower() in ["specifications", "specs", "productspecs", "props", "params"]:
-                                    if isinstance(value, list):
-                                        for item in value:
-                                            if isinstance(item, dict):
-                                                k = clean_text(item.get("name") or item.get("title") or item.get("key", "")).lower()
-                                                v = clean_text(item.get("value") or item.get("content") or item.get("val", ""))
-                                                if k and v:
-                                                    specs[k] = v
-                                    elif isinstance(value, dict):
-                                        for k, v in value.items():
-                                            k = clean_text(k).lower()
-                                            v = clean_text(str(v))
-                                            if k and v:
-                                                specs[k] = v
-                                elif key.lower() == "collections":
-                                    if isinstance(value, dict):
-                                        for coll_key, coll_val in value.items():
-                                            if isinstance(coll_val, dict) and "spec" in coll_key.lower():
-                                                for spec_key, spec_val in coll_val.items():
-                                                    k = clean_text(spec_key).lower()
-                                                    v = clean_text(str(spec_val))
-                                                    if k and v:
-                                                        specs[k] = v
-                                extract_recursive(value)
-                        elif isinstance(obj, list):
-                            for item in obj:
-                                extract_recursive(item)
-                    extract_recursive(data)
-            except Exception as e:
-                logger.debug(f"Ошибка при обработке JSON: {str(e)}")
+                data, pos = JSON_DECODER.raw_decode(text, match.end())
+                yield data
+            except ValueError:
+                pos = match.end()
+
+
+def extract_specs_from_json(document):
+    soup = make_soup(document) if isinstance(document, str) else document
+    return extract_specs_from_objects(iter_json_islands(soup))
+
+
+def extract_specs_from_objects(objects):
+    specs = {}
+    for root in objects:
+        stack = [root]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, dict):
+                children = []
+                for key, value in obj.items():
+                    lowered = key.lower()
+                    if lowered in SPEC_CONTAINER_KEYS:
+                        add_spec_pairs(value, specs)
+                    elif lowered == "collections" and isinstance(value, dict):
+                        for coll_key, coll_val in value.items():
+                            if isinstance(coll_val, dict) and "spec" in coll_key.lower():
+                                add_spec_pairs(coll_val, specs)
+                    if isinstance(value, (dict, list)):
+                        children.append(value)
+                stack.extend(reversed(children))
+            elif isinstance(obj, list):
+                stack.extend(reversed(obj))
     return specs
 
 
-def parse_product_page(url, driver):
-    html = get_html(url, driver)
-    if not html:
-        logger.warning(f"Не удалось загрузить страницу товара: {url}")
-        return {}
+def json_scalar(value, keys=("value", "raw", "text", "amount")):
+    if isinstance(value, dict):
+        for key in keys:
+            if value.get(key) is not None:
+                return json_scalar(value[key], keys)
+        return None
+    return value
 
-    click_full_specs_button(driver)
-    html = driver.page_source
-    soup = BeautifulSoup(html, "html.parser")
 
+def product_from_json(obj):
+    name = json_scalar(obj.get("title") or obj.get("name"))
+    price = json_scalar(obj.get("price"), ("value", "min", "amount", "current"))
+    link = obj.get("url") or obj.get("link") or obj.get("href")
+    if not link and obj.get("slug") and obj.get("id"):
+        link = f"/product--{obj['slug']}/{obj['id']}"
+    if not isinstance(name, str) or not isinstance(link, str) or price is None or "product" not in link:
+        return None
+    return {"name": name, "link": link, "price": str(price).split(".")[0]}
+
+
+def decode_catalog_payloads(payloads, page, last_updated=None):
+    # Товары из перехваченных JSON-ответов каталога, в том же виде, что и parse_catalog_html
+    last_updated = last_updated or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    products = []
+    seen = set()
+    stack = [entry["payload"] for entry in reversed(payloads)]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            found = product_from_json(obj)
+            if found:
+                product = build_product(found["name"], found["link"], found["price"], last_updated)
+                if product and product["link"] not in seen:
+                    seen.add(product["link"])
+                    products.append(product)
+                continue
+            stack.extend(reversed([value for value in obj.values() if isinstance(value, (dict, list))]))
+        elif isinstance(obj, list):
+            stack.extend(reversed(obj))
+    logger.info(f"Из JSON-ответов получено {len(products)} товаров на странице {page}")
+    return products
+
+
+def decode_spec_payloads(payloads):
+    return extract_specs_from_objects(entry["payload"] for entry in payloads)
+
+
+def capture_page_payloads(driver, url):
+    payloads = capture_json_responses(driver, collect_page_network(driver, url))
+    if CAPTURE_DIR:
+        save_capture(CAPTURE_DIR, url, payloads)
+    return payloads
+
+
+def spec_pairs_to_dict(pairs):
+    specs = {}
+    for key, value in pairs:
+        key = clean_text(key).lower()
+        value = clean_text(value)
+        if key and value:
+            specs[key] = value
+    return specs
+
+
+def extract_raw_specs(html):
+    with METRICS.timer("parse_specs"):
+        return extract_raw_specs_from_soup(make_soup(html))
+
+
+def extract_raw_specs_from_soup(soup):
     # Парсинг из DOM
     dom_specs = {}
     tables = soup.find_all("table")
@@ -396,54 +669,123 @@ def parse_product_page(url, driver):
                 if key and val:
                     dom_specs[key] = val
 
-    # Парсинг из JSON
-    json_specs = extract_specs_from_json(html)
+    # Парсинг из JSON по тому же дереву
+    json_specs = extract_specs_from_json(soup)
 
-    combined_specs = {**dom_specs, **json_specs}
-    if not combined_specs:
-        logger.warning(f"Не удалось извлечь характеристики для {url}")
+    return {**dom_specs, **json_specs}
 
-    specs = {
-        "screen_size": None,
-        "resolution": None,
-        "camera_mp": None,
-        "battery": None,
-        "processor": None,
-        "ram": None,
-        "storage": None,
-    }
 
-    for key, value in combined_specs.items():
-        mapped_key = None
-        for ru_key, en_key in SPEC_MAPPING.items():
-            if ru_key in key:
-                mapped_key = en_key
-                break
-        if not mapped_key or mapped_key not in specs:
-            continue
+def map_specs(combined_specs):
+    return SPEC_MATCHER.normalize(combined_specs)
 
-        try:
-            if mapped_key == "screen_size":
-                match = re.search(r"([\d.]+(?:–[\d.]+)?)(?=\s*дюйм)", value)
-                if match:
-                    val = match.group(1).split("–")[0]
-                    specs[mapped_key] = float(val)
 
-            elif mapped_key == "resolution":
-                match = re.search(r"(\d+x\d+)", value)
-                specs[mapped_key] = match.group() if match else value
+def map_specs_batch(combined_specs_list):
+    return SPEC_MATCHER.normalize_batch(combined_specs_list)
 
-            elif mapped_key in ["camera_mp", "battery", "ram", "storage"]:
-                match = re.search(r"(\d+)", value)
-                specs[mapped_key] = int(match.group()) if match else None
 
-            elif mapped_key == "processor":
-                specs[mapped_key] = value.strip()
+def create_http_session(driver=None):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    user_agent = driver.execute_script("return navigator.userAgent;") if driver else UserAgent().random
+    session.headers.update({**HTTP_HEADERS, "User-Agent": user_agent})
+    if driver:
+        copy_browser_cookies(driver, session)
+    return session
 
-        except Exception as e:
-            logger.warning(f"Ошибка преобразования {key}={value}: {e}")
-            continue
 
+def copy_browser_cookies(driver, session):
+    try:
+        for cookie in driver.get_cookies():
+            session.cookies.set(cookie["name"], cookie["value"],
+                                domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    except WebDriverException as e:
+        logger.debug(f"Не удалось скопировать cookies из браузера: {str(e)[:200]}")
+
+
+def get_html_light(url, session):
+    RATE_LIMITER.acquire(url)
+    try:
+        with METRICS.timer("http_fetch"):
+            response = session.get(url, timeout=HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        logger.debug(f"Быстрая загрузка {url} не удалась: {str(e)[:200]}")
+        return None
+    if response.status_code != 200:
+        logger.debug(f"Быстрая загрузка {url}: статус {response.status_code}")
+        return None
+    html = response.text
+    if "showcaptcha" in response.url.lower() or "Доступ ограничен" in html:
+        logger.info(f"Быстрая загрузка {url}: капча или ограничение доступа, переходим на браузер")
+        CIRCUIT_BREAKER.record(url, CaptchaError.kind if "showcaptcha" in response.url.lower() else AccessBlockedError.kind)
+        return None
+    if len(html) < 5000:
+        logger.debug(f"Быстрая загрузка {url}: слишком короткий HTML-код")
+        return None
+    logger.info(f"HTML загружен без браузера, длина: {len(html)} символов")
+    METRICS.inc("pages_total", source="http", kind=page_type(url))
+    METRICS.inc("html_bytes_total", len(html))
+    CIRCUIT_BREAKER.record(url)
+    return html
+
+
+def parse_product_page(url, driver, session=None, cache=None):
+    html = cache.get(url) if cache else None
+    if html:
+        return map_specs(extract_raw_specs(html))
+
+    if session:
+        html = get_html_light(url, session)
+        if html:
+            specs = map_specs(extract_raw_specs(html))
+            filled = sum(val is not None for val in specs.values())
+            if filled >= FAST_PATH_MIN_FIELDS:
+                if cache:
+                    cache.put(url, html)
+                logger.info(f"Характеристики извлечены без браузера: {specs}")
+                return specs
+            logger.info(f"В HTML без браузера заполнено {filled} из {len(specs)} характеристик, "
+                        f"загружаем через браузер: {url}")
+
+    html = get_html(url, driver, want_html=EXTRACTION_MODE == "dom")
+    if not html:
+        collect_page_network(driver, url)
+        logger.warning(f"Не удалось загрузить страницу товара: {url}")
+        return {}
+
+    with METRICS.timer("specs_click"):
+        click_full_specs_button(driver)
+    if session:
+        copy_browser_cookies(driver, session)
+    if EXTRACTION_MODE == "js":
+        collect_page_network(driver, url)
+        pairs, scripts = extract_spec_pairs(driver, SPEC_LIST_SELECTORS, JSON_SCRIPT_TYPES)
+        # Как и при разборе HTML, данные из JSON важнее пар из разметки
+        specs = map_specs({**spec_pairs_to_dict(pairs), **extract_specs_from_objects(iter_script_json(scripts))})
+        if any(val is not None for val in specs.values()):
+            logger.info(f"Характеристики извлечены в странице: {specs}")
+            return specs
+        logger.info(f"Скрипт в странице не нашел характеристик, разбираем HTML: {url}")
+    elif EXTRACTION_MODE == "network":
+        payload_specs = map_specs(decode_spec_payloads(capture_page_payloads(driver, url)))
+        if all(val is not None for val in payload_specs.values()):
+            logger.info(f"Характеристики извлечены из JSON-ответов: {payload_specs}")
+            return payload_specs
+        logger.info(f"В JSON-ответах не все характеристики, дополняем их из HTML: {url}")
+    else:
+        collect_page_network(driver, url)
+    html = driver.page_source
+    combined_specs = extract_raw_specs(html)
+    if not combined_specs:
+        logger.warning(f"Не удалось извлечь характеристики для {url}")
+    elif cache:
+        # Капча, страница ошибки или пустая страница в кэш не попадают
+        cache.put(url, html)
+
+    specs = map_specs(combined_specs)
+    if EXTRACTION_MODE == "network":
+        specs.update({field: value for field, value in payload_specs.items() if value is not None})
     logger.info(f"Характеристики извлечены: {specs}")
     return specs
 
@@ -451,202 +793,478 @@ def parse_product_page(url, driver):
 def setup_database():
     conn = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_connection()
+        migrate(conn)
+        logger.info("Схема базы данных актуальна.")
+    except Exception as e:
+        logger.error(f"Ошибка при миграции базы данных: {str(e)}")
+    finally:
+        if conn:
+            release_connection(conn)
+
+
+def load_known_specs():
+    conn = None
+    known_specs = {}
+    try:
+        conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute("SET client_encoding TO 'UTF8';")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                id SERIAL PRIMARY KEY,
-                name TEXT NOT NULL,
-                brand TEXT NOT NULL,
-                category TEXT NOT NULL,
-                created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS stores (
-                id SERIAL PRIMARY KEY,
-                name TEXT NOT NULL,
-                url TEXT NOT NULL
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS prices (
-                id SERIAL PRIMARY KEY,
-                product_id INTEGER NOT NULL,
-                store_id INTEGER NOT NULL,
-                price INTEGER NOT NULL,
-                last_updated TIMESTAMP WITHOUT TIME ZONE NOT NULL,
-                CONSTRAINT fk_prices_product FOREIGN KEY (product_id) REFERENCES products(id),
-                CONSTRAINT fk_prices_store FOREIGN KEY (store_id) REFERENCES stores(id)
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS price_history (
-                id SERIAL PRIMARY KEY,
-                product_id INTEGER NOT NULL,
-                store_id INTEGER NOT NULL,
-                price INTEGER NOT NULL,
-                recorded_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
-                CONSTRAINT fk_price_history_product FOREIGN KEY (product_id) REFERENCES products(id),
-                CONSTRAINT fk_price_history_store FOREIGN KEY (store_id) REFERENCES stores(id)
-            );
-        """)
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS product_specs (
-                id SERIAL PRIMARY KEY,
-                product_id INTEGER NOT NULL,
-                screen_size DOUBLE PRECISION,
-                resolution TEXT,
-                camera_mp INTEGER,
-                battery INTEGER,
-                processor TEXT,
-                ram INTEGER,
-                storage INTEGER,
-                CONSTRAINT fk_product_specs_product FOREIGN KEY (product_id) REFERENCES products(id),
-                CONSTRAINT unique_product_id UNIQUE (product_id)
-            );
+            SELECT p.name, p.brand, ps.updated_at
+            FROM products p
+            JOIN product_specs ps ON ps.product_id = p.id
+            WHERE ps.updated_at IS NOT NULL
         """)
-        conn.commit()
-        logger.info("Таблицы успешно созданы или уже существуют.")
+        for name, brand, updated_at in cursor.fetchall():
+            known_specs[(name, brand)] = updated_at
+        logger.info(f"Загружено {len(known_specs)} товаров с сохраненными характеристиками")
     except Exception as e:
-        logger.error(f"Ошибка при создании таблиц: {str(e)}")
+        logger.error(f"Ошибка при загрузке известных товаров: {str(e)}")
     finally:
         if conn:
             cursor.close()
-            conn.close()
+            release_connection(conn)
+    return known_specs
+
+
+# Слияние наблюдений цены с дневным агрегатом. Наблюдение определяется товаром, магазином и
+# временем; время не позже last_recorded_at за тот же день значит, что наблюдение уже учтено
+# (повторный разбор кэша, страница каталога из кэша), и такие записи в агрегат не передаются
+PRICE_ROLLUP_CONFLICT = """
+    ON CONFLICT (product_id, store_id, day) DO UPDATE SET
+        min_price = LEAST(price_daily_rollup.min_price, EXCLUDED.min_price),
+        max_price = GREATEST(price_daily_rollup.max_price, EXCLUDED.max_price),
+        sum_price = price_daily_rollup.sum_price + EXCLUDED.sum_price,
+        observations = price_daily_rollup.observations + EXCLUDED.observations,
+        last_price = CASE WHEN EXCLUDED.last_recorded_at >= price_daily_rollup.last_recorded_at
+                          THEN EXCLUDED.last_price ELSE price_daily_rollup.last_price END,
+        last_recorded_at = GREATEST(price_daily_rollup.last_recorded_at, EXCLUDED.last_recorded_at)
+"""
+
+
+def get_store_id(cursor):
+    store_name = "Yandex.Market"
+    store_url = "https://market.yandex.ru"
+    cursor.execute("SELECT id FROM stores WHERE name = %s", (store_name,))
+    store = cursor.fetchone()
+    if store:
+        return store[0]
+    cursor.execute("INSERT INTO stores (name, url) VALUES (%s, %s) RETURNING id", (store_name, store_url))
+    return cursor.fetchone()[0]
+
+
+def copy_products_to_staging(cursor, products):
+    cursor.execute("""
+        CREATE TEMP TABLE staging_products (
+            seq INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            category TEXT NOT NULL,
+            price INTEGER NOT NULL,
+            last_updated TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            has_specs BOOLEAN NOT NULL,
+            screen_size DOUBLE PRECISION,
+            resolution TEXT,
+            camera_mp INTEGER,
+            battery INTEGER,
+            processor TEXT,
+            ram INTEGER,
+            storage INTEGER,
+            product_id INTEGER
+        ) ON COMMIT DROP;
+    """)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    skipped = 0
+    for seq, product in enumerate(products):
+        if not product.get("name") or not product.get("brand"):
+            skipped += 1
+            continue
+        specs_dict = product.get("specifications") or {}
+        has_specs = any(val is not None for val in specs_dict.values())
+        writer.writerow([
+            seq, product["name"], product["brand"], product["category"], product["price"],
+            product["last_updated"], "t" if has_specs else "f",
+            *[specs_dict.get(field) for field in SPEC_FIELDS],
+        ])
+    if skipped:
+        logger.warning(f"Пропущено {skipped} продуктов: отсутствует название или бренд")
+    buffer.seek(0)
+    cursor.copy_expert(
+        "COPY staging_products (seq, name, brand, category, price, last_updated, has_specs, "
+        "screen_size, resolution, camera_mp, battery, processor, ram, storage) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
 
 
 def save_to_database(products):
     conn = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute("SET client_encoding TO 'UTF8';")
-        store_name = "Yandex.Market"
-        store_url = "https://market.yandex.ru"
-
-        cursor.execute("SELECT id FROM stores WHERE name = %s", (store_name,))
-        store = cursor.fetchone()
-        if not store:
-            cursor.execute("INSERT INTO stores (name, url) VALUES (%s, %s) RETURNING id", (store_name, store_url))
-            store_id = cursor.fetchone()[0]
-        else:
-            store_id = store[0]
+        store_id = get_store_id(cursor)
+        copy_products_to_staging(cursor, products)
 
-        products_added = 0
-        prices_added = 0
-        price_history_added = 0
-        specs_added = 0
-        specs_updated = 0
-
-        for product in products:
-            if not product.get("name") or not product.get("brand"):
-                logger.warning("Пропущен продукт: отсутствует название или бренд")
-                continue
+        cursor.execute("""
+            INSERT INTO products (name, brand, category, created_at)
+            SELECT DISTINCT ON (name, brand) name, brand, category, last_updated
+            FROM staging_products
+            ORDER BY name, brand, seq
+            ON CONFLICT (name, brand) DO NOTHING
+        """)
+        products_added = cursor.rowcount
 
-            cursor.execute("SELECT id FROM products WHERE name = %s AND brand = %s", (product["name"], product["brand"]))
-            existing_product = cursor.fetchone()
+        cursor.execute("""
+            UPDATE staging_products s SET product_id = p.id
+            FROM products p
+            WHERE p.name = s.name AND p.brand = s.brand
+        """)
 
-            if existing_product:
-                product_id = existing_product[0]
-            else:
-                cursor.execute(
-                    "INSERT INTO products (name, brand, category, created_at) VALUES (%s, %s, %s, %s) RETURNING id",
-                    (product["name"], product["brand"], product["category"], product["last_updated"])
-                )
-                product_id = cursor.fetchone()[0]
-                products_added += 1
-
-            cursor.execute(
-                "INSERT INTO price_history (product_id, store_id, price, recorded_at) VALUES (%s, %s, %s, %s)",
-                (product_id, store_id, product["price"], product["last_updated"])
+        cursor.execute("""
+            SELECT ensure_price_history_partition(month)
+            FROM (SELECT DISTINCT date_trunc('month', last_updated)::date AS month FROM staging_products) months
+        """)
+        # В историю попадают только изменения цены и периодические контрольные записи. Цена
+        # сравнивается с записью истории на момент наблюдения, а не с последней: повторный разбор
+        # старого кэша не должен выглядеть как изменение относительно более новой цены
+        cursor.execute("""
+            WITH latest AS (
+                SELECT DISTINCT ON (product_id) product_id, price, last_updated
+                FROM staging_products
+                ORDER BY product_id, last_updated DESC, seq DESC
             )
-            price_history_added += 1
+            INSERT INTO price_history (product_id, store_id, price, recorded_at)
+            SELECT l.product_id, %(store_id)s, l.price, l.last_updated
+            FROM latest l
+            LEFT JOIN LATERAL (
+                SELECT h.price, h.recorded_at
+                FROM price_history h
+                WHERE h.product_id = l.product_id AND h.store_id = %(store_id)s
+                  AND h.recorded_at <= l.last_updated
+                ORDER BY h.recorded_at DESC
+                LIMIT 1
+            ) previous ON TRUE
+            WHERE previous.recorded_at IS NULL
+               OR previous.recorded_at < l.last_updated
+                  AND (previous.price <> l.price OR previous.recorded_at < l.last_updated - %(heartbeat)s)
+        """, {"store_id": store_id, "heartbeat": timedelta(days=PRICE_HISTORY_HEARTBEAT_DAYS)})
+        price_history_added = cursor.rowcount
+
+        cursor.execute(f"""
+            INSERT INTO price_daily_rollup (product_id, store_id, day, min_price, max_price, sum_price,
+                                            observations, last_price, last_recorded_at)
+            SELECT s.product_id, %(store_id)s, s.last_updated::date, min(s.price), max(s.price), sum(s.price),
+                   count(*), (array_agg(s.price ORDER BY s.last_updated DESC))[1], max(s.last_updated)
+            FROM (
+                SELECT DISTINCT ON (product_id, last_updated) product_id, price, last_updated
+                FROM staging_products
+                ORDER BY product_id, last_updated, seq DESC
+            ) s
+            LEFT JOIN price_daily_rollup r
+                ON r.product_id = s.product_id AND r.store_id = %(store_id)s AND r.day = s.last_updated::date
+            WHERE r.last_recorded_at IS NULL OR s.last_updated > r.last_recorded_at
+            GROUP BY s.product_id, s.last_updated::date
+            {PRICE_ROLLUP_CONFLICT}
+        """, {"store_id": store_id})
 
-            cursor.execute("SELECT id FROM prices WHERE product_id = %s AND store_id = %s", (product_id, store_id))
-            existing_price = cursor.fetchone()
+        cursor.execute("""
+            INSERT INTO prices (product_id, store_id, price, last_updated)
+            SELECT DISTINCT ON (product_id) product_id, %s, price, last_updated
+            FROM staging_products
+            ORDER BY product_id, last_updated DESC, seq DESC
+            ON CONFLICT (product_id, store_id)
+            DO UPDATE SET price = EXCLUDED.price, last_updated = EXCLUDED.last_updated
+            WHERE prices.last_updated <= EXCLUDED.last_updated
+        """, (store_id,))
+        prices_added = cursor.rowcount
 
-            if existing_price:
-                cursor.execute(
-                    "UPDATE prices SET price = %s, last_updated = %s WHERE id = %s",
-                    (product["price"], product["last_updated"], existing_price[0])
-                )
-            else:
-                cursor.execute(
-                    "INSERT INTO prices (product_id, store_id, price, last_updated) VALUES (%s, %s, %s, %s)",
-                    (product_id, store_id, product["price"], product["last_updated"])
-                )
-            prices_added += 1
-
-            specs_dict = product.get("specifications", {})
-            if specs_dict and any(val is not None for val in specs_dict.values()):
-                cursor.execute("SELECT id FROM product_specs WHERE product_id = %s", (product_id,))
-                existing_specs = cursor.fetchone()
-
-                if existing_specs:
-                    cursor.execute(
-                        """
-                        UPDATE product_specs
-                        SET screen_size = %s, resolution = %s, camera_mp = %s,
-                            battery = %s, processor = %s, ram = %s, storage = %s
-                        WHERE product_id = %s
-                        """,
-                        (
-                            specs_dict["screen_size"],
-                            specs_dict["resolution"],
-                            specs_dict["camera_mp"],
-                            specs_dict["battery"],
-                            specs_dict["processor"],
-                            specs_dict["ram"],
-                            specs_dict["storage"],
-                            product_id
-                        )
-                    )
-                    specs_updated += 1
-                else:
-                    cursor.execute(
-                        """
-                        INSERT INTO product_specs (product_id, screen_size, resolution, camera_mp,
-                                                  battery, processor, ram, storage)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            product_id,
-                            specs_dict["screen_size"],
-                            specs_dict["resolution"],
-                            specs_dict["camera_mp"],
-                            specs_dict["battery"],
-                            specs_dict["processor"],
-                            specs_dict["ram"],
-                            specs_dict["storage"]
-                        )
-                    )
-                    specs_added += 1
-            else:
-                logger.warning(f"Пропущено сохранение спецификаций для продукта {product['name']} (ID: {product_id}): характеристики пустые")
+        cursor.execute("""
+            INSERT INTO product_specs (product_id, screen_size, resolution, camera_mp,
+                                       battery, processor, ram, storage, updated_at)
+            SELECT DISTINCT ON (product_id) product_id, screen_size, resolution, camera_mp,
+                   battery, processor, ram, storage, last_updated
+            FROM staging_products
+            WHERE has_specs
+            ORDER BY product_id, seq DESC
+            ON CONFLICT (product_id) DO UPDATE
+            SET screen_size = EXCLUDED.screen_size, resolution = EXCLUDED.resolution,
+                camera_mp = EXCLUDED.camera_mp, battery = EXCLUDED.battery,
+                processor = EXCLUDED.processor, ram = EXCLUDED.ram, storage = EXCLUDED.storage,
+                updated_at = EXCLUDED.updated_at
+            RETURNING (xmax = 0)
+        """)
+        inserted_flags = [row[0] for row in cursor.fetchall()]
+        specs_added = sum(inserted_flags)
+        specs_updated = len(inserted_flags) - specs_added
+
+        cursor.execute("""
+            SELECT count(*) FROM staging_products
+            WHERE NOT has_specs AND seq <> ALL(%s)
+        """, ([seq for seq, product in enumerate(products) if product.get("specs_fresh")],))
+        specs_missing = cursor.fetchone()[0]
+        if specs_missing:
+            logger.warning(f"Пропущено сохранение спецификаций для {specs_missing} продуктов: характеристики пустые")
 
         conn.commit()
         logger.info(f"Сохранено {products_added} новых продуктов, {prices_added} цен, "
                     f"{price_history_added} записей в истории цен, {specs_added} новых спецификаций, "
                     f"{specs_updated} спецификаций обновлено")
+        return True
     except Exception as e:
         logger.error(f"Ошибка при сохранении в базу данных: {str(e)}")
         if conn:
             conn.rollback()
+        return False
     finally:
         if conn:
             cursor.close()
-            conn.close()
+            release_connection(conn)
 
 
-def parse_catalog(page, driver):
+def compact_price_history(raw_months=PRICE_HISTORY_RAW_MONTHS, retention_months=PRICE_HISTORY_RETENTION_MONTHS):
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT c.relname, obj_description(c.oid, 'pg_class')
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'price_history'::regclass AND c.relname ~ '^price_history_[0-9]{4}_[0-9]{2}$'
+            ORDER BY c.relname
+        """)
+        partitions = cursor.fetchall()
+        current = datetime.now()
+        current_index = current.year * 12 + current.month - 1
+        dropped = compacted = 0
+        for name, comment in partitions:
+            year, month = int(name[-7:-3]), int(name[-2:])
+            age_months = current_index - (year * 12 + month - 1)
+            if age_months > retention_months:
+                cursor.execute(f"ALTER TABLE price_history DETACH PARTITION {name}")
+                cursor.execute(f"DROP TABLE {name}")
+                dropped += 1
+                logger.info(f"Секция {name} удалена по сроку хранения")
+            elif age_months > raw_months and comment != "compacted":
+                # Старые секции прореживаются до последней цены за день
+                cursor.execute(f"""
+                    DELETE FROM {name} h
+                    USING (
+                        SELECT id, row_number() OVER (
+                            PARTITION BY product_id, store_id, recorded_at::date
+                            ORDER BY recorded_at DESC, id DESC
+                        ) AS position
+                        FROM {name}
+                    ) ranked
+                    WHERE h.id = ranked.id AND ranked.position > 1
+                """)
+                removed = cursor.rowcount
+                cursor.execute(f"COMMENT ON TABLE {name} IS 'compacted'")
+                compacted += 1
+                logger.info(f"Секция {name} прорежена, удалено {removed} записей")
+            conn.commit()
+        logger.info(f"Обслуживание истории цен: {compacted} секций прорежено, {dropped} удалено")
+    except Exception as e:
+        logger.error(f"Ошибка при обслуживании истории цен: {str(e)}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            cursor.close()
+            release_connection(conn)
+
+
+def load_checkpoint(run_key, max_age=CHECKPOINT_MAX_AGE):
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT last_page, updated_at < NOW() - %s FROM crawl_checkpoints WHERE run_key = %s",
+                       (timedelta(seconds=max_age), run_key))
+        row = cursor.fetchone()
+        if not row:
+            return 0
+        if row[1]:
+            logger.info(f"Контрольная точка на странице {row[0]} старше {max_age / 3600:.0f} ч и не используется")
+            return 0
+        return row[0]
+    except Exception as e:
+        logger.error(f"Ошибка при чтении контрольной точки: {str(e)}")
+        return 0
+    finally:
+        if conn:
+            cursor.close()
+            release_connection(conn)
+
+
+def save_checkpoint(run_key, page):
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        if page is None:
+            cursor.execute("DELETE FROM crawl_checkpoints WHERE run_key = %s", (run_key,))
+        else:
+            cursor.execute("""
+                INSERT INTO crawl_checkpoints (run_key, last_page, updated_at) VALUES (%s, %s, NOW())
+                ON CONFLICT (run_key) DO UPDATE SET last_page = EXCLUDED.last_page, updated_at = EXCLUDED.updated_at
+            """, (run_key, page))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении контрольной точки: {str(e)}")
+    finally:
+        if conn:
+            cursor.close()
+            release_connection(conn)
+
+
+class DatabaseWriter:
+    # Отдельный поток записи в БД: сбрасывает пачки по DB_BATCH_SIZE записей или
+    # каждые DB_FLUSH_INTERVAL секунд; очередь ограничена, поэтому память не растет
+    def __init__(self, run_key=None, batch_size=DB_BATCH_SIZE, flush_interval=DB_FLUSH_INTERVAL):
+        self.run_key = run_key
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=batch_size * 4)
+        self.batch = []
+        self.failed = False
+        self.saved = 0
+        self.last_flush = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, product):
+        self.queue.put(("product", product))
+
+    def checkpoint(self, page):
+        self.queue.put(("checkpoint", page))
+
+    def _flush(self):
+        self.last_flush = time.monotonic()
+        if not self.batch:
+            return
+        with METRICS.timer("db_save"):
+            saved = save_to_database(self.batch)
+        if saved:
+            self.saved += len(self.batch)
+            METRICS.inc("products_saved_total", len(self.batch))
+        else:
+            self.failed = True
+        self.batch = []
+
+    def _run(self):
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - self.last_flush))
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush()
+                continue
+            if item is None:
+                self._flush()
+                break
+            kind, payload = item
+            if kind == "product":
+                self.batch.append(payload)
+                if len(self.batch) >= self.batch_size:
+                    self._flush()
+            elif kind == "checkpoint":
+                self._flush()
+                if self.run_key and not self.failed:
+                    save_checkpoint(self.run_key, payload)
+                    logger.info(f"Контрольная точка: страница {payload} сохранена")
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        return self.saved
+
+
+def cached_at(entry):
+    return datetime.fromtimestamp(entry["fetched_at"]).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_catalog(page, driver, cache=None):
     url = f"{BASE_URL}{page}"
-    html = get_html(url, driver)
+    last_updated = None
+    html = cache.get(url) if cache else None
+    if html:
+        # Цены со страницы из кэша относятся ко времени ее загрузки, а не к текущему обходу
+        entry = cache.get_entry(url)
+        if entry:
+            last_updated = cached_at(entry)
+    else:
+        html = get_html(url, driver, want_html=EXTRACTION_MODE == "dom")
+        if html and EXTRACTION_MODE == "network":
+            products = decode_catalog_payloads(capture_page_payloads(driver, url), page)
+            if products:
+                return products
+            logger.info(f"В JSON-ответах нет товаров, разбираем HTML страницы {page}")
+        else:
+            collect_page_network(driver, url)
+        if html and EXTRACTION_MODE == "js":
+            cards = extract_catalog_cards(driver, PRODUCT_CARD_SELECTORS, TITLE_SELECTORS,
+                                          LINK_SELECTORS, PRICE_SELECTORS)
+            products = parse_catalog_cards(cards, page)
+            if products:
+                return products
+            logger.info(f"Скрипт в странице не нашел товаров, разбираем HTML страницы {page}")
+        if html is True:
+            html = driver.page_source
+        if html and cache:
+            cache.put(url, html)
     if not html:
+        if catalog_ended(driver):
+            return None
         logger.info("Пустая страница")
         return []
-    soup = BeautifulSoup(html, "html.parser")
+    with METRICS.timer("parse_catalog"):
+        return parse_catalog_html(html, page, last_updated=last_updated)
+
+
+def build_product(name, href, price_text, last_updated):
+    name = clean_text(name)
+    if not name:
+        return None
+
+    link = MARKET_ORIGIN + href if href.startswith("/") else href
+    price_text = re.sub(r"[^\d]", "", price_text.strip())
+    brand = extract_brand(name)
+
+    if not price_text or not price_text.isdigit():
+        return None
+
+    try:
+        price = int(price_text)
+    except ValueError:
+        return None
+
+    return {
+        "name": name,
+        "brand": brand,
+        "category": "Smartphone",
+        "price": price,
+        "store": "Yandex.Market",
+        "link": link,
+        "last_updated": last_updated
+    }
+
+
+def parse_catalog_cards(cards, page, last_updated=None):
+    last_updated = last_updated or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    products = []
+    for card in cards:
+        product = build_product(card["name"], card["link"], card["price"], last_updated)
+        if product:
+            products.append(product)
+    logger.info(f"В странице извлечено {len(cards)} карточек, после фильтрации {len(products)} товаров на странице {page}")
+    return products
+
+
+def parse_catalog_html(html, page, last_updated=None):
+    last_updated = last_updated or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    soup = make_soup(html)
     products = []
     for card_selector in PRODUCT_CARD_SELECTORS:
         items = soup.select(card_selector)
@@ -682,69 +1300,422 @@ def parse_catalog(page, driver):
         if not price_tag:
             continue
 
-        name = clean_text(name_tag.text)
-        if not name:
-            continue
+        product = build_product(name_tag.text, link_tag["href"], price_tag.text, last_updated)
+        if product:
+            products.append(product)
+
+    logger.info(f"После фильтрации найдено {len(products)} товаров на странице {page}")
+    return products
 
-        link = "https://market.yandex.ru"  + link_tag["href"] if link_tag["href"].startswith("/") else link_tag["href"]
-        price_text = re.sub(r"[^\d]", "", price_tag.text.strip()) if price_tag else ""
-        brand = extract_brand(name)
 
-        if not price_text or not price_text.isdigit():
-            continue
+class SpecWorkerPool:
+    # Независимые браузеры из общего пула; страницы товаров раздаёт асинхронный планировщик
+    def __init__(self, workers, browser_pool, fast_path=True, concurrency=None, cache=None):
+        self.browser_pool = browser_pool
+        self.fast_path = fast_path
+        self.cache = cache
+        self.workers = []
+        browser_pool.prelaunch(workers)
+        for worker_id in range(1, workers + 1):
+            try:
+                browser = browser_pool.acquire()
+            except RuntimeError as e:
+                logger.error(f"Воркер {worker_id}: {str(e)}")
+                continue
+            self.workers.append({
+                "id": worker_id,
+                "browser": browser,
+                "session": create_http_session(browser.driver) if fast_path else None,
+                "pages": 0,
+                "started": time.time(),
+            })
+            logger.info(f"Воркер {worker_id} запущен")
+        if not self.workers:
+            raise RuntimeError("Не удалось запустить ни одного воркера")
+        self.scheduler = CrawlScheduler(self.workers, concurrency)
+
+    def _process(self, worker, url):
+        browser = worker["browser"]
+        try:
+            specs = parse_product_page(url, browser.driver, worker["session"], self.cache)
+        except Exception as e:
+            logger.error(f"Воркер {worker['id']}: ошибка при обработке {url}: {str(e)}")
+            specs = {}
+        worker["pages"] += 1
+        worker["browser"] = self.browser_pool.after_page(browser)
+        if worker["browser"] is not browser and worker["session"]:
+            worker["session"].close()
+            worker["session"] = create_http_session(worker["browser"].driver)
+        return specs
+
+    def map(self, urls):
+        return self.scheduler.run(urls, self._process)
+
+    def log_stats(self):
+        for worker in self.workers:
+            elapsed_min = max(time.time() - worker["started"], 1e-6) / 60
+            logger.info(f"Воркер {worker['id']}: {worker['pages']} страниц, "
+                        f"{worker['pages'] / elapsed_min:.2f} стр/мин")
+
+    def close(self):
+        self.log_stats()
+        for worker in self.workers:
+            if worker["session"]:
+                worker["session"].close()
+            self.browser_pool.release(worker["browser"])
+            logger.info(f"Воркер {worker['id']} остановлен")
+
+
+class CatalogPrefetcher:
+    # Загружает и разбирает следующие страницы каталога своим браузером,
+    # пока основной поток обрабатывает товары текущей страницы
+    def __init__(self, browser_pool, start_page, max_pages, cache=None, depth=CATALOG_PREFETCH_DEPTH):
+        self.browser_pool = browser_pool
+        self.start_page = start_page
+        self.max_pages = max_pages
+        self.cache = cache
+        self.pages = queue.Queue(maxsize=max(1, depth))
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="catalog-prefetch", daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.pages.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
+    def _run(self):
+        browser = None
         try:
-            price = int(price_text)
-        except ValueError:
+            browser = self.browser_pool.acquire()
+            for page in range(self.start_page, self.max_pages + 1):
+                if self.stopped.is_set():
+                    break
+                try:
+                    products = parse_catalog(page, browser.driver, self.cache)
+                except Exception as e:
+                    logger.error(f"Ошибка предзагрузки страницы каталога {page}: {str(e)}")
+                    products = []
+                browser = self.browser_pool.after_page(browser)
+                if not self._put((page, products)) or products is None:
+                    break
+        except Exception as e:
+            logger.error(f"Предзагрузка каталога остановлена: {str(e)}")
+        finally:
+            if browser:
+                self.browser_pool.release(browser)
+            self._put(None)
+
+    def __iter__(self):
+        while True:
+            item = self.pages.get()
+            if item is None:
+                return
+            yield item
+
+    def close(self):
+        self.stopped.set()
+        while True:
+            try:
+                self.pages.get_nowait()
+            except queue.Empty:
+                break
+        self.thread.join()
+
+
+def reparse_from_cache(cache):
+    setup_database()
+    writer = DatabaseWriter()
+    catalog_entries = []
+    for entry in cache.entries("catalog"):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(entry["url"]).query)
+        page = int(query.get("page", ["1"])[0] or 1)
+        catalog_entries.append((page, entry))
+    catalog_entries.sort(key=lambda item: (item[0], item[1]["fetched_at"]))
+    logger.info(f"Найдено {len(catalog_entries)} страниц каталога в кэше")
+
+    for page, entry in catalog_entries:
+        html = cache.get(entry["url"], allow_stale=True)
+        if not html:
             continue
+        products = parse_catalog_html(html, page, last_updated=cached_at(entry))
+        for product in products:
+            product_html = cache.get(product["link"], allow_stale=True)
+            if product_html:
+                product["specifications"] = map_specs(extract_raw_specs(product_html))
+            else:
+                logger.warning(f"Нет страницы товара в кэше: {product['link']}")
+                product["specifications"] = {}
+            writer.put(product)
 
-        product = {
-            "name": name,
-            "brand": brand,
-            "category": "Smartphone",
-            "price": price,
-            "store": "Yandex.Market",
-            "link": link,
-            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        products.append(product)
+    saved = writer.close()
+    if not saved:
+        logger.error("Нет данных для сохранения!")
+        close_pool()
+        return
+    logger.info(f"Повторный разбор кэша завершен! Обработано {saved} товаров.")
+    close_pool()
 
-    logger.info(f"После фильтрации найдено {len(products)} товаров на странице {page}")
-    return products
+
+def specs_are_fresh(known_specs, product, max_age):
+    updated_at = known_specs.get((product["name"], product["brand"]))
+    return updated_at is not None and datetime.now() - updated_at < max_age
 
 
-def main(max_pages=1):
-    driver = setup_driver()
-    all_products = []
+def next_browser(browser_pool, browser, session):
+    next_one = browser_pool.after_page(browser)
+    if next_one is not browser and session:
+        session.close()
+        session = create_http_session(next_one.driver)
+    return next_one, next_one.driver, session
+
+
+def main(max_pages=1, workers=1, fast_path=True, concurrency=None, cache=None,
+         incremental=False, max_spec_age_days=SPEC_MAX_AGE_DAYS, resume=True,
+         prefetch_depth=CATALOG_PREFETCH_DEPTH):
     setup_database()
+    start_page = load_checkpoint(BASE_URL) + 1 if resume else 1
+    if start_page > max_pages:
+        # Прошлый обход дошел до последней страницы, но не завершился (сбой в повторном
+        # проходе или при записи): считаем его законченным и начинаем заново
+        logger.info(f"Контрольная точка на странице {start_page - 1} покрывает все {max_pages} страниц, "
+                    f"начинаем с первой страницы")
+        save_checkpoint(BASE_URL, None)
+        start_page = 1
+    if start_page > 1:
+        logger.info(f"Продолжаем с контрольной точки: страница {start_page}")
+    prefetching = prefetch_depth > 0 and start_page < max_pages
+    browser_pool = BrowserPool(setup_driver, spares=0 if prefetching else BROWSER_SPARES)
+    browser = browser_pool.acquire()
+    driver = browser.driver
+    session = create_http_session(driver) if fast_path else None
+    pool = SpecWorkerPool(workers, browser_pool, fast_path, concurrency, cache) if workers > 1 else None
+    writer = DatabaseWriter(run_key=BASE_URL)
+    known_specs = load_known_specs() if incremental else None
+    max_spec_age = timedelta(days=max_spec_age_days)
+    prefetcher = None
+    deferred_pages = []
+    deferred_products = []
+    last_page = None
+    completed = False
+
+    def page_done(page):
+        # Контрольная точка не переходит через отложенную страницу или товар, пока
+        # повторный проход их не обработает: после сбоя обход продолжится с них
+        nonlocal last_page
+        last_page = page
+        if not deferred_pages and not deferred_products:
+            writer.checkpoint(page)
+
+    def enrich(products):
+        nonlocal browser, driver, session
+        if session:
+            copy_browser_cookies(driver, session)
+        to_fetch = []
+        for product in products:
+            if known_specs is not None and specs_are_fresh(known_specs, product, max_spec_age):
+                product["specifications"] = {}
+                product["specs_fresh"] = True
+            else:
+                to_fetch.append(product)
+        if known_specs is not None:
+            logger.info(f"Характеристики актуальны для {len(products) - len(to_fetch)} товаров, "
+                        f"загружаем {len(to_fetch)}")
+        if pool:
+            specs_list = pool.map([product["link"] for product in to_fetch])
+            for product, specs in zip(to_fetch, specs_list):
+                product["specifications"] = specs
+            pool.log_stats()
+        else:
+            for i, product in enumerate(to_fetch, 1):
+                logger.info(f"Обрабатываем товар {i}/{len(to_fetch)}: {product['name']}")
+                product["specifications"] = parse_product_page(product["link"], driver, session, cache)
+                browser, driver, session = next_browser(browser_pool, browser, session)
+        for product in to_fetch:
+            METRICS.inc("spec_pages_total")
+            for field, value in product["specifications"].items():
+                if value is not None:
+                    METRICS.inc("spec_fields_filled_total", field=field)
+        if known_specs is not None:
+            for product in to_fetch:
+                if any(val is not None for val in product["specifications"].values()):
+                    known_specs[(product["name"], product["brand"])] = datetime.now()
+        return to_fetch
+
     try:
-        for page in range(1, max_pages + 1):
-            if page % 5 == 0:
-                driver.quit()
-                driver = setup_driver()
-                logger.info("Драйвер перезапущен для смены User-Agent")
+        if prefetching:
+            prefetcher = CatalogPrefetcher(browser_pool, start_page, max_pages, cache, prefetch_depth)
+            catalog_pages = iter(prefetcher)
+        else:
+            catalog_pages = ((page, None) for page in range(start_page, max_pages + 1))
+        for page, products in catalog_pages:
             logger.info(f"\nПарсим страницу {page} из {max_pages}...")
-            products = parse_catalog(page, driver)
+            if not prefetcher:
+                products = parse_catalog(page, driver, cache)
+                browser, driver, session = next_browser(browser_pool, browser, session)
+            if products is None:
+                logger.info(f"Страница {page} пуста - достигнут конец каталога")
+                break
             if not products:
+                if f"{BASE_URL}{page}" in FAILED_URLS:
+                    deferred_pages.append(page)
                 logger.info(f"Нет товаров на странице {page}. Пропускаем.")
+                page_done(page)
                 continue
-            for i, product in enumerate(products, 1):
-                logger.info(f"Обрабатываем товар {i}/{len(products)}: {product['name']}")
-                specs = parse_product_page(product["link"], driver)
-                product["specifications"] = specs
-                all_products.append(product)
-                time.sleep(random.uniform(2, 5))
-        if not all_products:
-            logger.error("Нет данных для сохранения!")
-            return
-        save_to_database(all_products)
-        logger.info(f"Парсинг завершен! Обработано {len(all_products)} товаров.")
+            for product in enrich(products):
+                if product["link"] in FAILED_URLS:
+                    deferred_products.append(product)
+            deferred = {product["link"] for product in deferred_products}
+            for product in products:
+                if product["link"] not in deferred:
+                    writer.put(product)
+            page_done(page)
+            if METRICS_TEXTFILE:
+                METRICS.write_textfile(METRICS_TEXTFILE)
+            if PROFILER:
+                PROFILER.page_boundary(f"страница {page}")
+
+        # Повторный проход по адресам, исчерпавшим попытки в основном проходе
+        if deferred_pages or deferred_products:
+            logger.info(f"Повторный проход: {len(deferred_pages)} страниц каталога, "
+                        f"{len(deferred_products)} товаров")
+            if prefetcher:
+                prefetcher.close()
+                prefetcher = None
+            for page in deferred_pages:
+                products = parse_catalog(page, driver, cache)
+                browser, driver, session = next_browser(browser_pool, browser, session)
+                if products:
+                    deferred_products.extend(products)
+            enrich(deferred_products)
+            for product in deferred_products:
+                writer.put(product)
+            if last_page is not None:
+                writer.checkpoint(last_page)
+            logger.info(f"После повторного прохода не загружено адресов: {len(FAILED_URLS)}")
+            if PROFILER:
+                PROFILER.page_boundary("повторный проход")
+            deferred_products = []
+        completed = True
     except Exception as e:
         logger.error(f"Критическая ошибка: {str(e)}")
     finally:
-        driver.quit()
+        if prefetcher:
+            prefetcher.close()
+        for product in deferred_products:
+            writer.put(product)
+        saved = writer.close()
+        if completed and not writer.failed:
+            save_checkpoint(BASE_URL, None)
+        if not saved:
+            logger.error("Нет данных для сохранения!")
+        else:
+            logger.info(f"Парсинг завершен! Обработано {saved} товаров.")
+        if pool:
+            pool.close()
+        log_readiness_totals()
+        log_network_totals()
+        if CIRCUIT_BREAKER.trips():
+            logger.info(f"Срабатываний защиты хоста: {CIRCUIT_BREAKER.trips()}")
+        if METRICS_TEXTFILE:
+            METRICS.write_textfile(METRICS_TEXTFILE)
+        if METRICS_SUMMARY:
+            METRICS.write_summary(METRICS_SUMMARY)
+        if session:
+            session.close()
+        browser_pool.release(browser)
+        browser_pool.close()
         logger.info("Драйвер закрыт.")
+        close_pool()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Парсер смартфонов с Яндекс.Маркета")
+    parser.add_argument("--pages", type=int, default=1, help="количество страниц каталога")
+    parser.add_argument("--workers", type=int, default=1, help="количество браузеров для страниц товаров")
+    parser.add_argument("--no-fast-path", action="store_true",
+                        help="загружать страницы товаров только через браузер")
+    parser.add_argument("--rpm", type=float, default=REQUESTS_PER_MINUTE,
+                        help="целевое число запросов в минуту к одному хосту")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="максимум одновременно обрабатываемых страниц товаров")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="каталог дискового кэша HTML")
+    parser.add_argument("--no-cache", action="store_true", help="не использовать кэш HTML")
+    parser.add_argument("--prune-cache", action="store_true",
+                        help="удалить из кэша HTML записи старше времени жизни и неиспользуемые файлы "
+                             "(после этого --reparse их уже не увидит)")
+    parser.add_argument("--reparse", action="store_true",
+                        help="пересобрать товары и характеристики только из кэша, без загрузки страниц")
+    parser.add_argument("--incremental", action="store_true",
+                        help="загружать страницы товаров только для новых товаров и устаревших характеристик")
+    parser.add_argument("--max-spec-age-days", type=float, default=SPEC_MAX_AGE_DAYS,
+                        help="возраст характеристик в днях, после которого они загружаются заново")
+    parser.add_argument("--parser", choices=PARSER_BACKENDS, default=HTML_PARSER,
+                        help="парсер HTML для BeautifulSoup")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="начать с первой страницы, игнорируя контрольную точку")
+    parser.add_argument("--compact-history", action="store_true",
+                        help="проредить старые секции истории цен и удалить секции старше срока хранения")
+    parser.add_argument("--headless", action="store_true", help="запускать браузеры без окна")
+    parser.add_argument("--no-block-resources", action="store_true",
+                        help="загружать картинки, медиа, шрифты и трекеры")
+    parser.add_argument("--no-network-stats", action="store_true",
+                        help="не собирать счетчики запросов и трафика по страницам")
+    parser.add_argument("--prefetch", type=int, default=CATALOG_PREFETCH_DEPTH,
+                        help="сколько страниц каталога загружать заранее отдельным браузером (0 — отключить)")
+    parser.add_argument("--metrics-file", default=METRICS_TEXTFILE,
+                        help="файл метрик в текстовом формате Prometheus, обновляется после каждой страницы")
+    parser.add_argument("--metrics-summary", default=METRICS_SUMMARY,
+                        help="JSON-сводка метрик по завершении обхода (пустая строка — не сохранять)")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_DIR, default=None,
+                        help="профилировать обход: cProfile, свернутые стеки всех потоков и снимки памяти "
+                             "tracemalloc по страницам (по умолчанию в каталог profiles)")
+    parser.add_argument("--profile-interval", type=float, default=SAMPLE_INTERVAL,
+                        help="интервал выборки стеков в секундах")
+    parser.add_argument("--extraction", choices=EXTRACTION_MODES, default=EXTRACTION_MODE,
+                        help="способ извлечения данных в браузере: разбор HTML, перехват JSON-ответов "
+                             "или скрипт в странице")
+    parser.add_argument("--capture-dir", default=None,
+                        help="сохранять перехваченные JSON-ответы страниц в этот каталог")
+    return parser.parse_args()
+
+
+def run_command(args, cache):
+    if args.compact_history:
+        setup_database()
+        compact_price_history()
+        close_pool()
+    elif args.prune_cache:
+        (cache or HtmlCache(args.cache_dir)).prune()
+    elif args.reparse:
+        reparse_from_cache(cache or HtmlCache(args.cache_dir))
+    else:
+        main(max_pages=args.pages, workers=max(1, args.workers), fast_path=not args.no_fast_path,
+             concurrency=args.concurrency, cache=cache, incremental=args.incremental,
+             max_spec_age_days=args.max_spec_age_days, resume=not args.no_resume,
+             prefetch_depth=max(0, args.prefetch))
 
 
 if __name__ == "__main__":
-    main(max_pages=1)
\ No newline at end of file
+    args = parse_args()
+    RATE_LIMITER = HostRateLimiter(args.rpm, RATE_BURST, RATE_JITTER, CIRCUIT_BREAKER)
+    HTML_PARSER = resolve_parser_backend(args.parser)
+    HEADLESS = args.headless
+    BLOCK_RESOURCES = not args.no_block_resources
+    NETWORK_STATS = not args.no_network_stats
+    EXTRACTION_MODE = args.extraction
+    CAPTURE_DIR = args.capture_dir
+    METRICS_TEXTFILE = args.metrics_file
+    METRICS_SUMMARY = args.metrics_summary
+    cache = None if args.no_cache else HtmlCache(args.cache_dir)
+    if args.profile:
+        PROFILER = CrawlProfiler(args.profile, args.profile_interval).start()
+    try:
+        run_command(args, cache)
+    finally:
+        if PROFILER:
+            PROFILER.stop()
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# Сравнение прежней построчной записи (save_to_database_rowwise ниже) и пакетной
+# записи через COPY и ON CONFLICT (Backend.save_to_database) на локальном PostgreSQL.
+# Работает в отдельной базе (по умолчанию phones_bench), таблицы в ней очищаются.
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2  # noqa: E402
+
+import Backend  # noqa: E402
+from db import DB_CONFIG, execute_prepared, get_connection, release_connection  # noqa: E402
+
+BENCH_TABLES = "price_history, prices, product_specs, products, stores"
+
+
+def generate_products(count, price_shift=0):
+    products = []
+    for i in range(count):
+        products.append({
+            "name": f"Смартфон Benchmark {i} 8/256 ГБ",
+            "brand": f"Brand{i % 40}",
+            "category": "Smartphone",
+            "price": 10000 + (i * 37 + price_shift) % 90000,
+            "store": "Yandex.Market",
+            "link": f"https://market.yandex.ru/product--benchmark-{i}/{i}",
+            "last_updated": "2026-01-01 12:00:00",
+            "specifications": {
+                "screen_size": 6.1 + (i % 7) / 10,
+                "resolution": "2400x1080",
+                "camera_mp": 50,
+                "battery": 5000,
+                "processor": "Snapdragon",
+                "ram": 8,
+                "storage": 256,
+            },
+        })
+    return products
+
+
+# Прежняя построчная запись: по несколько запросов на товар. Оставлена только
+# как точка отсчета для сравнения с save_to_database
+def save_to_database_rowwise(products):
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SET client_encoding TO 'UTF8';")
+        store_name = "Yandex.Market"
+        store_url = "https://market.yandex.ru"
+
+        cursor.execute("SELECT id FROM stores WHERE name = %s", (store_name,))
+        store = cursor.fetchone()
+        if not store:
+            cursor.execute("INSERT INTO stores (name, url) VALUES (%s, %s) RETURNING id", (store_name, store_url))
+            store_id = cursor.fetchone()[0]
+        else:
+            store_id = store[0]
+
+        products_added = 0
+        prices_added = 0
+        price_history_added = 0
+        specs_added = 0
+        specs_updated = 0
+
+        for product in products:
+            if not product.get("name") or not product.get("brand"):
+                Backend.logger.warning("Пропущен продукт: отсутствует название или бренд")
+                continue
+
+            execute_prepared(cursor, "find_product", (product["name"], product["brand"]))
+            existing_product = cursor.fetchone()
+
+            if existing_product:
+                product_id = existing_product[0]
+            else:
+                cursor.execute(
+                    "INSERT INTO products (name, brand, category, created_at) VALUES (%s, %s, %s, %s) RETURNING id",
+                    (product["name"], product["brand"], product["category"], product["last_updated"])
+                )
+                product_id = cursor.fetchone()[0]
+                products_added += 1
+
+            cursor.execute("SELECT id, price FROM prices WHERE product_id = %s AND store_id = %s", (product_id, store_id))
+            existing_price = cursor.fetchone()
+
+            cursor.execute(
+                "SELECT max(recorded_at) < %s::timestamp - %s FROM price_history WHERE product_id = %s AND store_id = %s",
+                (product["last_updated"], timedelta(days=Backend.PRICE_HISTORY_HEARTBEAT_DAYS), product_id, store_id)
+            )
+            heartbeat_due = cursor.fetchone()[0]
+            if not existing_price or existing_price[1] != product["price"] or heartbeat_due is not False:
+                cursor.execute("SELECT ensure_price_history_partition(%s::date)", (product["last_updated"],))
+                cursor.execute(
+                    "INSERT INTO price_history (product_id, store_id, price, recorded_at) VALUES (%s, %s, %s, %s)",
+                    (product_id, store_id, product["price"], product["last_updated"])
+                )
+                price_history_added += 1
+
+            cursor.execute(
+                f"""
+                INSERT INTO price_daily_rollup (product_id, store_id, day, min_price, max_price, sum_price,
+                                                observations, last_price, last_recorded_at)
+                SELECT %(product_id)s, %(store_id)s, %(recorded_at)s::date, %(price)s, %(price)s, %(price)s,
+                       1, %(price)s, %(recorded_at)s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM price_daily_rollup
+                    WHERE product_id = %(product_id)s AND store_id = %(store_id)s
+                      AND day = %(recorded_at)s::date AND last_recorded_at >= %(recorded_at)s
+                )
+                {Backend.PRICE_ROLLUP_CONFLICT}
+                """,
+                {"product_id": product_id, "store_id": store_id, "price": product["price"],
+                 "recorded_at": product["last_updated"]}
+            )
+
+            if existing_price:
+                cursor.execute(
+                    "UPDATE prices SET price = %s, last_updated = %s WHERE id = %s",
+                    (product["price"], product["last_updated"], existing_price[0])
+                )
+            else:
+                cursor.execute(
+                    "INSERT INTO prices (product_id, store_id, price, last_updated) VALUES (%s, %s, %s, %s)",
+                    (product_id, store_id, product["price"], product["last_updated"])
+                )
+            prices_added += 1
+
+            specs_dict = product.get("specifications", {})
+            if specs_dict and any(val is not None for val in specs_dict.values()):
+                cursor.execute("SELECT id FROM product_specs WHERE product_id = %s", (product_id,))
+                existing_specs = cursor.fetchone()
+
+                if existing_specs:
+                    cursor.execute(
+                        """
+                        UPDATE product_specs
+                        SET screen_size = %s, resolution = %s, camera_mp = %s,
+                            battery = %s, processor = %s, ram = %s, storage = %s, updated_at = %s
+                        WHERE product_id = %s
+                        """,
+                        (
+                            specs_dict["screen_size"],
+                            specs_dict["resolution"],
+                            specs_dict["camera_mp"],
+                            specs_dict["battery"],
+                            specs_dict["processor"],
+                            specs_dict["ram"],
+                            specs_dict["storage"],
+                            product["last_updated"],
+                            product_id
+                        )
+                    )
+                    specs_updated += 1
+                else:
+                    cursor.execute(
+                        """
+                        INSERT INTO product_specs (product_id, screen_size, resolution, camera_mp,
+                                                  battery, processor, ram, storage, updated_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        """,
+                        (
+                            product_id,
+                            specs_dict["screen_size"],
+                            specs_dict["resolution"],
+                            specs_dict["camera_mp"],
+                            specs_dict["battery"],
+                            specs_dict["processor"],
+                            specs_dict["ram"],
+                            specs_dict["storage"],
+                            product["last_updated"]
+                        )
+                    )
+                    specs_added += 1
+            elif not product.get("specs_fresh"):
+                Backend.logger.warning(f"Пропущено сохранение спецификаций для продукта {product['name']} (ID: {product_id}): характеристики пустые")
+
+        conn.commit()
+        Backend.logger.info(f"Сохранено {products_added} новых продуктов, {prices_added} цен, "
+                    f"{price_history_added} записей в истории цен, {specs_added} новых спецификаций, "
+                    f"{specs_updated} спецификаций обновлено")
+        return True
+    except Exception as e:
+        Backend.logger.error(f"Ошибка при сохранении в базу данных: {str(e)}")
+        if conn:
+            conn.rollback()
+        return False
+    finally:
+        if conn:
+            cursor.close()
+            release_connection(conn)
+
+
+def ensure_database(dbname):
+    conn = psycopg2.connect(**{**DB_CONFIG, "dbname": "postgres"})
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+        if not cursor.fetchone():
+            cursor.execute(f'CREATE DATABASE "{dbname}"')
+    conn.close()
+
+
+def truncate_tables():
+    conn = psycopg2.connect(**DB_CONFIG)
+    with conn.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {BENCH_TABLES} RESTART IDENTITY CASCADE")
+    conn.commit()
+    conn.close()
+
+
+def timed(save, products):
+    started = time.perf_counter()
+    if not save(products):
+        raise RuntimeError("Запись в базу данных завершилась с ошибкой")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк записи товаров в PostgreSQL")
+    parser.add_argument("--dbname", default="phones_bench", help="отдельная база для замеров")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="размеры пачек через запятую")
+    args = parser.parse_args()
+
+    if args.dbname == DB_CONFIG["dbname"]:
+        parser.error("нельзя запускать бенчмарк на рабочей базе")
+    ensure_database(args.dbname)
+    DB_CONFIG["dbname"] = args.dbname
+    Backend.logger.setLevel("WARNING")
+    Backend.setup_database()
+
+    paths = [("построчно", save_to_database_rowwise), ("COPY + ON CONFLICT", Backend.save_to_database)]
+    print(f"{'товаров':>8}  {'способ':<20} {'вставка, с':>11} {'обновление, с':>14} {'товаров/с':>10}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        for label, save in paths:
+            truncate_tables()
+            insert_time = timed(save, generate_products(size))
+            update_time = timed(save, generate_products(size, price_shift=1))
+            rate = 2 * size / (insert_time + update_time)
+            print(f"{size:>8}  {label:<20} {insert_time:>11.2f} {update_time:>14.2f} {rate:>10,.0f}")
+    truncate_tables()
+
+
+if __name__ == "__main__":
+    main()
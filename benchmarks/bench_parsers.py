@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# Офлайн-бенчмарк парсеров на корпусе страниц benchmarks/corpus: пропускная
+# способность и пиковая память разбора каталога, характеристик, JSON-островов,
+# clean_text и extract_brand. Результаты сохраняются в benchmarks/results
+# и сравниваются с предыдущим запуском.
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import Backend  # noqa: E402
+
+from corpus import load_pages  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def collect_texts(catalog_pages, product_pages):
+    # Строки, которые парсер пропускает через clean_text: названия карточек и пары характеристик
+    names = []
+    for _, html in catalog_pages:
+        names.extend(product["name"] for product in Backend.parse_catalog_html(html, 0))
+    texts = list(names)
+    for _, html in product_pages:
+        for key, value in Backend.extract_raw_specs(html).items():
+            texts.extend((key, value))
+    return names, texts
+
+
+def build_cases(catalog_pages, product_pages):
+    catalog_html = [html for _, html in catalog_pages]
+    product_html = [html for _, html in product_pages]
+    names, texts = collect_texts(catalog_pages, product_pages)
+    return [
+        ("catalog_cards", "стр", catalog_html,
+         lambda items: [Backend.parse_catalog_html(html, 0) for html in items]),
+        ("product_specs", "стр", product_html,
+         lambda items: [Backend.map_specs(Backend.extract_raw_specs(html)) for html in items]),
+        ("specs_from_json", "стр", product_html,
+         lambda items: [Backend.extract_specs_from_json(html) for html in items]),
+        ("clean_text", "строк", texts,
+         lambda items: [Backend.clean_text(text) for text in items]),
+        ("extract_brand", "назв", names,
+         lambda items: [Backend.extract_brand(name) for name in items]),
+    ]
+
+
+def run_case(items, func, repeat):
+    func(items)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(items)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(items)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "items": len(items),
+        "best_s": best,
+        "per_s": len(items) / best if best else 0.0,
+        "peak_kib": peak / 1024,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(results, label):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"{stamp}-{label or results['revision']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_baseline(reference):
+    if reference != "latest":
+        with open(reference, encoding="utf-8") as f:
+            return json.load(f), reference
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    if not paths:
+        return None, None
+    with open(paths[-1], encoding="utf-8") as f:
+        return json.load(f), paths[-1]
+
+
+def print_results(results, baseline=None):
+    print(f"{'случай':<16} {'единиц':>7} {'в секунду':>12} {'лучшее, мс':>11} {'пик, КиБ':>10}"
+          + (f" {'скорость':>9} {'память':>8}" if baseline else ""))
+    for name, case in results["cases"].items():
+        line = (f"{name:<16} {case['items']:>7} {case['per_s']:>12,.0f} {case['best_s'] * 1000:>11.1f} "
+                f"{case['peak_kib']:>10,.0f}")
+        previous = (baseline or {}).get("cases", {}).get(name)
+        if previous:
+            speed = case["per_s"] / previous["per_s"] - 1 if previous["per_s"] else 0.0
+            memory = case["peak_kib"] / previous["peak_kib"] - 1 if previous["peak_kib"] else 0.0
+            line += f" {speed:>+9.1%} {memory:>+8.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк парсеров на корпусе страниц")
+    parser.add_argument("--repeat", type=int, default=5, help="количество повторов, берется лучшее время")
+    parser.add_argument("--parser", choices=Backend.PARSER_BACKENDS, default=Backend.HTML_PARSER,
+                        help="парсер HTML для BeautifulSoup")
+    parser.add_argument("--save", action="store_true", help="сохранить результаты в benchmarks/results")
+    parser.add_argument("--label", default=None, help="метка файла результатов вместо ревизии git")
+    parser.add_argument("--compare", nargs="?", const="latest", default=None,
+                        help="сравнить с файлом результатов или с последним сохраненным запуском")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    Backend.HTML_PARSER = Backend.resolve_parser_backend(args.parser)
+    catalog_pages = load_pages("catalog")
+    product_pages = load_pages("product")
+    if not catalog_pages or not product_pages:
+        sys.exit("Корпус пуст: запустите make_synthetic_corpus.py или record_corpus.py")
+    sources = sorted({page["source"] for page, _ in catalog_pages + product_pages})
+
+    results = {
+        "revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "parser": Backend.HTML_PARSER,
+        "corpus": {"catalog": len(catalog_pages), "product": len(product_pages), "sources": sources},
+        "repeat": args.repeat,
+        "cases": {},
+    }
+    for name, unit, items, func in build_cases(catalog_pages, product_pages):
+        results["cases"][name] = {"unit": unit, **run_case(items, func, args.repeat)}
+
+    baseline, baseline_path = load_baseline(args.compare) if args.compare else (None, None)
+    print(f"Корпус: {len(catalog_pages)} стр. каталога, {len(product_pages)} стр. товаров "
+          f"({', '.join(sources)}), парсер {Backend.HTML_PARSER}, ревизия {results['revision']}")
+    if baseline_path:
+        print(f"Сравнение с {os.path.basename(baseline_path)} (ревизия {baseline.get('revision')})")
+    elif args.compare:
+        print("Нет сохраненных результатов для сравнения")
+    print_results(results, baseline)
+    if args.save:
+        print(f"Результаты сохранены в {save_results(results, args.label)}")
+
+
+if __name__ == "__main__":
+    main()
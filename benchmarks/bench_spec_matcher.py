@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Замер пропускной способности сопоставления и нормализации характеристик:
+# прежний построчный цикл по SPEC_MAPPING против SpecMatcher.normalize_batch
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Backend import SPEC_MAPPING  # noqa: E402
+from spec_matcher import SpecMatcher  # noqa: E402
+
+EXTRA_KEYS = [
+    "тип дисплея", "цвет", "материал корпуса", "операционная система", "версия bluetooth",
+    "стандарт связи", "вес", "габариты", "количество sim-карт", "степень защиты",
+    "частота обновления экрана", "фронтальная камера", "беспроводная зарядка", "nfc",
+]
+SAMPLE_VALUES = {
+    "screen_size": ["6.1 дюйм", "6.67 дюйма", "6.5–6.8 дюйм"],
+    "resolution": ["2400x1080", "2778 × 1284", "1600x720 пикс"],
+    "camera_mp": ["50 Мп", "108 Мп", "12 Мп + 12 Мп"],
+    "battery": ["5000 мА·ч", "4323 мА·ч", "6000 мАч"],
+    "processor": ["Snapdragon 8 Gen 2", "Apple A16 Bionic", "MediaTek Helio G99"],
+    "ram": ["8 ГБ", "12 ГБ", "4 ГБ"],
+    "storage": ["128 ГБ", "256 ГБ", "1 ТБ"],
+}
+
+
+def legacy_map_specs(combined_specs):
+    specs = dict.fromkeys(SAMPLE_VALUES)
+    for key, value in combined_specs.items():
+        mapped_key = None
+        for ru_key, en_key in SPEC_MAPPING.items():
+            if ru_key in key:
+                mapped_key = en_key
+                break
+        if not mapped_key or mapped_key not in specs:
+            continue
+        try:
+            if mapped_key == "screen_size":
+                match = re.search(r"([\d.]+(?:–[\d.]+)?)(?=\s*дюйм)", value)
+                if match:
+                    specs[mapped_key] = float(match.group(1).split("–")[0])
+            elif mapped_key == "resolution":
+                match = re.search(r"(\d+x\d+)", value)
+                specs[mapped_key] = match.group() if match else value
+            elif mapped_key in ["camera_mp", "battery", "ram", "storage"]:
+                match = re.search(r"(\d+)", value)
+                specs[mapped_key] = int(match.group()) if match else None
+            elif mapped_key == "processor":
+                specs[mapped_key] = value.strip()
+        except Exception:
+            continue
+    return specs
+
+
+def generate_raw_specs(count, seed):
+    rng = random.Random(seed)
+    keys = list(SPEC_MAPPING.items())
+    batch = []
+    for _ in range(count):
+        raw = {}
+        for ru_key, field in rng.sample(keys, 8):
+            raw[f"{ru_key}, ед." if rng.random() < 0.3 else ru_key] = rng.choice(SAMPLE_VALUES[field])
+        for key in rng.sample(EXTRA_KEYS, 10):
+            raw[key] = "значение"
+        batch.append(raw)
+    return batch
+
+
+def measure(label, func, batch, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(batch)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {len(batch) / best:>12,.0f} словарей/с  ({best * 1000:.1f} мс)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сопоставления характеристик")
+    parser.add_argument("--count", type=int, default=5000, help="количество словарей характеристик")
+    parser.add_argument("--repeat", type=int, default=5, help="количество повторов")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    batch = generate_raw_specs(args.count, args.seed)
+    legacy = measure("построчный цикл", lambda b: [legacy_map_specs(raw) for raw in b], batch, args.repeat)
+    cold = measure("SpecMatcher (новый автомат)", lambda b: SpecMatcher(SPEC_MAPPING).normalize_batch(b), batch, args.repeat)
+    matcher = SpecMatcher(SPEC_MAPPING)
+    warm = measure("SpecMatcher (прогретый кэш)", matcher.normalize_batch, batch, args.repeat)
+    print(f"Ускорение: {legacy / cold:.1f}x с новым автоматом, {legacy / warm:.1f}x с прогретым кэшем")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Проверка разбора сохраненных JSON-ответов (--capture-dir) на образцах из
+# benchmarks/captures: товары каталога через decode_catalog_payloads и
+# характеристики через decode_spec_payloads и map_specs. Браузер и сеть не нужны.
+import logging
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import Backend  # noqa: E402
+from network import load_capture  # noqa: E402
+
+CAPTURES_DIR = os.path.join(BENCH_DIR, "captures")
+CAPTURED_AT = "2026-10-12 14:05:31"
+
+# Баннер без товарной ссылки и товар без цены отбрасываются, повтор товара
+# из второго ответа учитывается один раз
+EXPECTED_CATALOG = [
+    ("Смартфон Apple iPhone 15 128 ГБ черный", "Apple", 69990,
+     "https://market.yandex.ru/product--smartfon-apple-iphone-15-128-gb-chernyi/1968503217"),
+    ("Смартфон Xiaomi Redmi Note 13 8/256 ГБ Global синий", "Xiaomi", 18490,
+     "https://market.yandex.ru/product--smartfon-xiaomi-redmi-note-13-8-256-gb/1795483012?sku=102345"),
+    ("Смартфон Samsung Galaxy A55 8/256 ГБ голубой", "Samsung", 34990,
+     "https://market.yandex.ru/product--smartfon-samsung-galaxy-a55-8-256-gb/1732004512"),
+]
+
+EXPECTED_SPECS = {
+    "screen_size": 6.67,
+    "resolution": "2400x1080",
+    "camera_mp": 108,
+    "battery": 5000,
+    "processor": "Qualcomm Snapdragon 685",
+    "ram": 8,
+    "storage": 256,
+}
+
+
+def check(label, actual, expected):
+    if actual != expected:
+        print(f"{label}: ОШИБКА\n  ожидалось: {expected}\n  получено:  {actual}")
+        return False
+    print(f"{label}: ок")
+    return True
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    catalog = Backend.decode_catalog_payloads(load_capture(os.path.join(CAPTURES_DIR, "catalog.json")), 2,
+                                              last_updated=CAPTURED_AT)
+    products = [(p["name"], p["brand"], p["price"], p["link"]) for p in catalog]
+    raw_specs = Backend.decode_spec_payloads(load_capture(os.path.join(CAPTURES_DIR, "product.json")))
+
+    results = [
+        check("товары каталога", products, EXPECTED_CATALOG),
+        check("время цен", {p["last_updated"] for p in catalog}, {CAPTURED_AT}),
+        check("характеристики", Backend.map_specs(raw_specs), EXPECTED_SPECS),
+    ]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Корпус страниц для офлайн-бенчмарков: сжатые HTML в benchmarks/corpus/<тип>/
+# и manifest.json с адресом, типом, источником и временем записи каждой страницы
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+MANIFEST_NAME = "manifest.json"
+PAGE_KINDS = ("catalog", "product")
+
+
+def manifest_path(root=CORPUS_DIR):
+    return os.path.join(root, MANIFEST_NAME)
+
+
+def load_manifest(root=CORPUS_DIR):
+    try:
+        with open(manifest_path(root), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"pages": []}
+
+
+def save_manifest(manifest, root=CORPUS_DIR):
+    manifest["pages"].sort(key=lambda page: (page["kind"], page["file"]))
+    with open(manifest_path(root), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def add_page(manifest, kind, url, html, source, root=CORPUS_DIR):
+    if kind not in PAGE_KINDS:
+        raise ValueError(f"Неизвестный тип страницы: {kind}")
+    data = html.encode("utf-8")
+    name = f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]}.html.gz"
+    os.makedirs(os.path.join(root, kind), exist_ok=True)
+    # mtime=0, чтобы повторная запись той же страницы давала тот же файл
+    with open(os.path.join(root, kind, name), "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    manifest["pages"] = [page for page in manifest["pages"] if page["url"] != url]
+    manifest["pages"].append({
+        "kind": kind,
+        "file": f"{kind}/{name}",
+        "url": url,
+        "source": source,
+        "size": len(data),
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+    })
+
+
+def load_pages(kind, root=CORPUS_DIR):
+    pages = []
+    for page in load_manifest(root)["pages"]:
+        if page["kind"] != kind:
+            continue
+        with gzip.open(os.path.join(root, page["file"]), "rt", encoding="utf-8") as f:
+            pages.append((page, f.read()))
+    return pages
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# Нагрузочный прогон полного main() против локального стенда площадки
+# (market_standin.py): скорость в страницах в минуту, процессорное время и
+# память парсера вместе с браузерами. Сеть не нужна, но нужны локальный
+# Chrome с chromedriver (CHROMEDRIVER_PATH) и PostgreSQL; таблицы отдельной
+# базы (по умолчанию phones_loadtest) очищаются перед прогоном.
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import psycopg2  # noqa: E402
+
+from market_standin import MarketStandin, StandinConfig  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+LOADTEST_TABLES = "price_daily_rollup, price_history, prices, product_specs, products, stores, crawl_checkpoints"
+SAMPLE_INTERVAL = 1.0
+
+
+class ResourceSampler:
+    # Суммирует процессорное время и память парсера и всех его дочерних
+    # процессов (chromedriver, Chrome); у завершившихся процессов остается
+    # последнее снятое значение
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.cpu = {}
+        self.peak_rss = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+
+    def sample(self):
+        root = psutil.Process()
+        rss = 0
+        for proc in [root] + root.children(recursive=True):
+            try:
+                times = proc.cpu_times()
+                rss += proc.memory_info().rss
+            except psutil.Error:
+                continue
+            self.cpu[proc.pid] = times.user + times.system
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if psutil is not None:
+            self.sample()
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if psutil is None:
+            usage_self = resource.getrusage(resource.RUSAGE_SELF)
+            usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            return {
+                "cpu_s": usage_self.ru_utime + usage_self.ru_stime + usage_children.ru_utime + usage_children.ru_stime,
+                "peak_rss_mb": usage_self.ru_maxrss / 1024,
+                "rss_scope": "только процесс парсера (psutil не установлен)",
+            }
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+        return {
+            "cpu_s": sum(self.cpu.values()),
+            "peak_rss_mb": self.peak_rss / 2 ** 20,
+            "rss_scope": "парсер и дочерние процессы",
+        }
+
+
+def prepare_database(dbname):
+    from db import DB_CONFIG
+
+    config = {**DB_CONFIG, "dbname": "postgres"}
+    conn = psycopg2.connect(**config)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+        if not cursor.fetchone():
+            cursor.execute(f'CREATE DATABASE "{dbname}"')
+    conn.close()
+    Backend.setup_database()
+    conn = psycopg2.connect(**DB_CONFIG)
+    with conn.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {LOADTEST_TABLES} RESTART IDENTITY CASCADE")
+    conn.commit()
+    conn.close()
+    Backend.close_pool()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон парсера против локального стенда")
+    parser.add_argument("--dbname", default="phones_loadtest", help="отдельная база для прогона")
+    parser.add_argument("--pages", type=int, default=3, help="сколько страниц каталога обходить")
+    parser.add_argument("--catalog-pages", type=int, default=None,
+                        help="сколько страниц каталога отдает стенд до пустой (по умолчанию --pages)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--prefetch", type=int, default=1)
+    parser.add_argument("--no-fast-path", action="store_true", help="страницы товаров только через браузер")
+    parser.add_argument("--extraction", choices=("dom", "network", "js"), default="dom")
+    parser.add_argument("--rpm", type=float, default=600, help="темп запросов к стенду")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--blocked-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--headed", action="store_true", help="запускать браузеры с окном")
+    parser.add_argument("--output", default=None, help="сохранить отчет прогона в JSON")
+    return parser.parse_args()
+
+
+def main():
+    global Backend
+    args = parse_args()
+    config = StandinConfig(args.latency_ms, captcha_rate=args.captcha_rate, blocked_rate=args.blocked_rate,
+                           error_rate=args.error_rate, catalog_pages=args.catalog_pages or args.pages)
+    standin = MarketStandin(config).start()
+
+    # Адрес площадки и база читаются из окружения при импорте Backend
+    os.environ["PHONES_MARKET_ORIGIN"] = standin.origin
+    os.environ["PHONES_DB_NAME"] = args.dbname
+    import Backend
+    from scheduler import HostRateLimiter
+
+    Backend.RATE_LIMITER = HostRateLimiter(args.rpm, Backend.RATE_BURST, Backend.RATE_JITTER,
+                                           Backend.CIRCUIT_BREAKER)
+    Backend.HEADLESS = not args.headed
+    Backend.EXTRACTION_MODE = args.extraction
+    Backend.METRICS_SUMMARY = None
+    prepare_database(args.dbname)
+
+    print(f"Стенд: {standin.origin}, база {args.dbname}")
+    sampler = ResourceSampler().start()
+    started = time.perf_counter()
+    try:
+        Backend.main(max_pages=args.pages, workers=max(1, args.workers), fast_path=not args.no_fast_path,
+                     concurrency=args.concurrency, cache=None, resume=False,
+                     prefetch_depth=max(0, args.prefetch))
+    finally:
+        elapsed = time.perf_counter() - started
+        usage = sampler.stop()
+        standin.stop()
+
+    summary = Backend.METRICS.summary()
+    served = dict(standin.stats)
+    pages_served = served.get("catalog", 0) + served.get("product", 0)
+    report = {
+        "settings": vars(args),
+        "elapsed_s": round(elapsed, 1),
+        "pages_per_min": round(pages_served / elapsed * 60, 2),
+        "crawler_pages_per_min": summary["pages_per_min"],
+        "pages_by_source": summary["pages_by_source"],
+        "products_saved": summary["products_saved"],
+        "failures": summary["failures"],
+        "served": served,
+        "cpu_s": round(usage["cpu_s"], 1),
+        "cpu_per_page_s": round(usage["cpu_s"] / pages_served, 3) if pages_served else None,
+        "peak_rss_mb": round(usage["peak_rss_mb"], 1),
+        "rss_scope": usage["rss_scope"],
+        "stages": summary["stages"],
+    }
+    print(f"Время: {report['elapsed_s']} с, отдано страниц: {pages_served}, {report['pages_per_min']} стр/мин")
+    print(f"Сохранено товаров: {report['products_saved']}, по источникам: {report['pages_by_source']}")
+    print(f"Ответы стенда: {served}")
+    print(f"Процессор: {report['cpu_s']} с ({report['cpu_per_page_s']} с/стр), "
+          f"пик памяти: {report['peak_rss_mb']} МБ ({report['rss_scope']})")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Отчет сохранен в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# Синтетический корпус для бенчмарков парсеров: страницы повторяют разметку,
+# на которую рассчитаны селекторы и разбор JSON в Backend.py, но не сняты с сайта.
+# Записанные страницы (record_corpus.py) заменяют или дополняют его.
+import argparse
+import json
+import random
+
+from corpus import add_page, load_manifest, save_manifest
+
+BRANDS = ["Samsung", "Apple", "Xiaomi", "Realme", "HONOR", "POCO", "Tecno", "Infinix", "vivo", "OPPO"]
+MODELS = ["Galaxy A55", "iPhone 15", "Redmi Note 13", "12 Pro", "X8c", "X6 Pro", "Spark 20", "Hot 40", "V30", "Reno 11"]
+PROCESSORS = ["Snapdragon 8 Gen 2", "Apple A16 Bionic", "MediaTek Helio G99", "Dimensity 7200", "Exynos 1480"]
+FILLER_WORDS = ["доставка", "отзывы", "рейтинг", "кешбэк", "в наличии", "сравнить", "в избранное", "продавец"]
+
+
+def filler(rng, words):
+    return " ".join(rng.choice(FILLER_WORDS) for _ in range(words))
+
+
+def page_shell(rng, title, body, state):
+    styles = "\n".join(f".c{i}{{margin:{i % 7}px;color:#{rng.randrange(16 ** 6):06x}}}" for i in range(300))
+    scripts = "\n".join(f"<script>window.__metric{i}=function(){{return {i};}};</script>" for i in range(20))
+    return (f"<!DOCTYPE html><html lang=\"ru\"><head><meta charset=\"utf-8\"><title>{title}</title>"
+            f"<style>{styles}</style>{scripts}</head><body><div id=\"root\">{body}</div>"
+            f"<script>window.__APIARY_STATE__ = {json.dumps(state, ensure_ascii=False)};</script>"
+            f"</body></html>")
+
+
+def phone(rng, index):
+    brand = rng.choice(BRANDS)
+    model = rng.choice(MODELS)
+    ram = rng.choice([4, 6, 8, 12])
+    storage = rng.choice([64, 128, 256, 512])
+    return {
+        "name": f"Смартфон {brand} {model} {ram}/{storage} ГБ, {rng.choice(['черный', 'синий', 'серый'])}",
+        "slug": f"smartfon-{brand.lower()}-{model.lower().replace(' ', '-')}-{index}",
+        "id": 100000 + index,
+        "price": rng.randrange(7990, 149990, 10),
+        "ram": ram,
+        "storage": storage,
+    }
+
+
+def catalog_page(rng, page, cards):
+    items = []
+    for i in range(cards):
+        item = phone(rng, page * 1000 + i)
+        price = f"{item['price']:,}".replace(",", " ")
+        items.append(
+            f"<div data-zone-name=\"snippet-card\"><div class=\"c{i % 300}\">"
+            f"<a href=\"/product--{item['slug']}/{item['id']}?sku={item['id']}\">"
+            f"<h3 data-zone-name=\"title\">{item['name']}</h3></a>"
+            f"<div class=\"rating\">{filler(rng, 6)}</div>"
+            f"<span data-auto=\"snippet-price-current\">{price} ₽</span>"
+            f"<div class=\"meta\">{filler(rng, 12)}</div></div></div>"
+        )
+    state = {"widgets": [{"id": i, "text": filler(rng, 10)} for i in range(200)]}
+    return page_shell(rng, "Смартфоны — купить", "".join(items), state)
+
+
+def product_page(rng, index):
+    item = phone(rng, index)
+    table_rows = [
+        ("Диагональ экрана", f"{rng.choice(['6.1', '6.5', '6.67', '6.78'])} дюйм"),
+        ("Разрешение экрана", f"{rng.choice(['2400x1080', '2778 × 1284', '1600x720'])}"),
+        ("Основная камера", f"{rng.choice([12, 48, 50, 108, 200])} Мп"),
+        ("Процессор", rng.choice(PROCESSORS)),
+        ("Цвет", "черный"),
+        ("Материал корпуса", "стекло, алюминий"),
+    ]
+    rows = "".join(f"<tr><th>{key}</th><td>{value}</td></tr>" for key, value in table_rows)
+    json_specs = {"productSpecs": {"specifications": [
+        {"name": "Емкость аккумулятора", "value": f"{rng.choice([4000, 4323, 5000, 6000])} мА·ч"},
+        {"name": "Оперативная память", "value": f"{item['ram']} ГБ"},
+        {"name": "Объем встроенной памяти", "value": f"{item['storage']} ГБ"},
+        {"name": "Версия Bluetooth", "value": "5.3"},
+    ]}}
+    reviews = "".join(f"<div class=\"review\"><p>{filler(rng, 40)}</p></div>" for _ in range(30))
+    body = (f"<h1 data-auto=\"productCardTitle\">{item['name']}</h1>"
+            f"<div data-auto=\"specs-list-fullExtended\"><table>{rows}</table></div>"
+            f"<script type=\"application/json\">{json.dumps(json_specs, ensure_ascii=False)}</script>"
+            f"{reviews}")
+    state = {"offers": [{"shop": f"shop{i}", "price": item["price"] + i * 100} for i in range(60)]}
+    return f"/product--{item['slug']}/{item['id']}", page_shell(rng, item["name"], body, state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетического корпуса страниц")
+    parser.add_argument("--catalog-pages", type=int, default=3)
+    parser.add_argument("--cards", type=int, default=48, help="карточек на странице каталога")
+    parser.add_argument("--product-pages", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=2024)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    manifest = load_manifest()
+    for page in range(1, args.catalog_pages + 1):
+        url = f"https://market.yandex.ru/catalog--smartfony/26893750/list?hid=91491&page={page}&synthetic=1"
+        add_page(manifest, "catalog", url, catalog_page(rng, page, args.cards), "synthetic")
+    for index in range(args.product_pages):
+        path, html = product_page(rng, index)
+        add_page(manifest, "product", f"https://market.yandex.ru{path}?synthetic=1", html, "synthetic")
+    save_manifest(manifest)
+    print(f"Корпус: {len(manifest['pages'])} страниц")
+
+
+if __name__ == "__main__":
+    main()
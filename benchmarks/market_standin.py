@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Локальный стенд площадки для нагрузочных прогонов без сети: отдает страницы
+# корпуса benchmarks/corpus по тем же адресам, что BASE_URL и ссылки /product--,
+# с настраиваемой задержкой, капчей, блокировками, ошибками и пустой страницей
+# после последней страницы каталога
+import argparse
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from corpus import load_pages
+
+CATALOG_PATH = "/catalog--smartfony/26893750/list"
+PRODUCT_LINK_RE = re.compile(r'href="/product--([^"/?]+)/(\d+)')
+
+EMPTY_PAGE = ("<!DOCTYPE html><html><head><title>Смартфоны</title></head><body>"
+              "<div data-zone-name=\"emptyState\">Нет товаров</div>" + " " * 6000 + "</body></html>")
+CAPTCHA_PAGE = ("<!DOCTYPE html><html><head><title>Капча</title></head><body>"
+                "<form action=\"/checkcaptcha\"><input name=\"rep\"></form></body></html>")
+BLOCKED_PAGE = ("<!DOCTYPE html><html><head><title>Доступ ограничен</title></head><body>"
+                "<p>Доступ ограничен</p></body></html>")
+ERROR_PAGE = "<!DOCTYPE html><html><head><title>Ошибка</title></head><body>500</body></html>"
+
+
+class StandinConfig:
+    def __init__(self, latency_ms=300, latency_jitter=0.5, captcha_rate=0.0, blocked_rate=0.0,
+                 error_rate=0.0, catalog_pages=5, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_jitter = latency_jitter
+        self.captcha_rate = captcha_rate
+        self.blocked_rate = blocked_rate
+        self.error_rate = error_rate
+        self.catalog_pages = catalog_pages
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def roll(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def delay(self):
+        with self.rng_lock:
+            spread = self.rng.uniform(1 - self.latency_jitter, 1 + self.latency_jitter)
+        return max(0.0, self.latency_ms * spread / 1000)
+
+
+class MarketStandin:
+    def __init__(self, config, host="127.0.0.1", port=0):
+        self.config = config
+        self.catalog = [html for _, html in load_pages("catalog")]
+        self.products = [html for _, html in load_pages("product")]
+        if not self.catalog or not self.products:
+            raise RuntimeError("Корпус пуст: запустите make_synthetic_corpus.py или record_corpus.py")
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def origin(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+
+    def catalog_page(self, page):
+        if page > self.config.catalog_pages:
+            return EMPTY_PAGE
+        html = self.catalog[(page - 1) % len(self.catalog)]
+        # Страницы корпуса повторяются по кругу, поэтому ссылки делаются уникальными для страницы
+        return PRODUCT_LINK_RE.sub(lambda m: f'href="/product--{m.group(1)}-p{page}/{m.group(2)}', html)
+
+    def product_page(self, path):
+        return self.products[zlib.crc32(path.encode("utf-8")) % len(self.products)]
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_html(self, status, html, headers=None):
+                body = html.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                if url.path == "/showcaptcha":
+                    standin.count("captcha_page")
+                    return self.send_html(200, CAPTCHA_PAGE)
+                is_catalog = url.path == CATALOG_PATH
+                if not is_catalog and not url.path.startswith("/product--"):
+                    # Картинки, счетчики и прочие ресурсы страницы стенду не нужны
+                    standin.count("not_found")
+                    return self.send_html(404, "")
+                time.sleep(standin.config.delay())
+                roll = standin.config.roll()
+                config = standin.config
+                if roll < config.captcha_rate:
+                    standin.count("captcha")
+                    retpath = urllib.parse.quote(self.path, safe="")
+                    return self.send_html(302, "", {"Location": f"/showcaptcha?retpath={retpath}"})
+                roll -= config.captcha_rate
+                if roll < config.blocked_rate:
+                    standin.count("blocked")
+                    return self.send_html(403, BLOCKED_PAGE)
+                roll -= config.blocked_rate
+                if roll < config.error_rate:
+                    standin.count("error")
+                    return self.send_html(500, ERROR_PAGE)
+                if is_catalog:
+                    query = urllib.parse.parse_qs(url.query)
+                    try:
+                        page = int(query.get("page", ["1"])[0])
+                    except ValueError:
+                        page = 1
+                    standin.count("catalog" if page <= config.catalog_pages else "empty")
+                    return self.send_html(200, standin.catalog_page(page))
+                standin.count("product")
+                return self.send_html(200, standin.product_page(url.path))
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="market-standin", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный стенд площадки")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--blocked-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--catalog-pages", type=int, default=5, help="после этой страницы отдается пустая")
+    args = parser.parse_args()
+
+    config = StandinConfig(args.latency_ms, captcha_rate=args.captcha_rate, blocked_rate=args.blocked_rate,
+                           error_rate=args.error_rate, catalog_pages=args.catalog_pages)
+    standin = MarketStandin(config, port=args.port)
+    print(f"Стенд запущен: PHONES_MARKET_ORIGIN={standin.origin}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.server.server_close()
+        print(f"Ответы: {standin.stats}")
+
+
+if __name__ == "__main__":
+    main()
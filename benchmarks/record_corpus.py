@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Пополнение корпуса бенчмарков реальными страницами: из кэша HTML парсера,
+# из дампов error_page_*.html или загрузкой указанных адресов через браузер
+import argparse
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Backend  # noqa: E402
+from html_cache import CACHE_DIR, HtmlCache, page_type  # noqa: E402
+
+from corpus import add_page, load_manifest, save_manifest  # noqa: E402
+
+
+def record_from_cache(manifest, cache_dir, kind, limit):
+    cache = HtmlCache(cache_dir)
+    recorded = 0
+    for entry in cache.entries(kind):
+        if recorded >= limit:
+            break
+        html = cache.get(entry["url"], allow_stale=True)
+        if html:
+            add_page(manifest, entry["page_type"], entry["url"], html, "cache")
+            recorded += 1
+    return recorded
+
+
+def record_error_pages(manifest, pattern):
+    recorded = 0
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        # По имени дампа тип страницы не определить, поэтому смотрим на разметку
+        kind = "catalog" if "snippet-card" in html else "product"
+        add_page(manifest, kind, f"file://{os.path.abspath(path)}", html, "error_page")
+        recorded += 1
+    return recorded
+
+
+def record_urls(manifest, urls):
+    driver = Backend.setup_driver()
+    recorded = 0
+    try:
+        for url in urls:
+            html = Backend.get_html(url, driver)
+            if page_type(url) == "product" and html:
+                Backend.click_full_specs_button(driver)
+                html = driver.page_source
+            if html:
+                add_page(manifest, page_type(url), url, html, "live")
+                recorded += 1
+            else:
+                print(f"Не удалось загрузить {url}")
+    finally:
+        driver.quit()
+    return recorded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запись страниц в корпус бенчмарков")
+    parser.add_argument("--from-cache", nargs="?", const=CACHE_DIR, default=None,
+                        help="взять страницы из кэша HTML (по умолчанию html_cache)")
+    parser.add_argument("--kind", choices=("catalog", "product"), default=None,
+                        help="какие страницы брать из кэша")
+    parser.add_argument("--limit", type=int, default=20, help="максимум страниц из кэша")
+    parser.add_argument("--error-pages", default=None, help="шаблон пути к дампам error_page_*.html")
+    parser.add_argument("urls", nargs="*", help="адреса для загрузки через браузер")
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    recorded = 0
+    if args.from_cache:
+        recorded += record_from_cache(manifest, args.from_cache, args.kind, args.limit)
+    if args.error_pages:
+        recorded += record_error_pages(manifest, args.error_pages)
+    if args.urls:
+        recorded += record_urls(manifest, args.urls)
+    save_manifest(manifest)
+    print(f"Записано страниц: {recorded}, всего в корпусе: {len(manifest['pages'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Пороги пересоздания браузера
+RECYCLE_MAX_PAGES = 200
+RECYCLE_RSS_GROWTH_MB = 600
+RECYCLE_CAPTCHA_RATE = 0.3
+RECYCLE_CAPTCHA_MIN_PAGES = 5
+RSS_CHECK_EVERY = 5
+
+
+def note_captcha(driver):
+    driver.crawl_captchas = getattr(driver, "crawl_captchas", 0) + 1
+
+
+def process_tree_rss(driver):
+    # Память chromedriver и всех процессов Chrome под ним; без psutil не измеряется
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+    except (psutil.Error, AttributeError):
+        return None
+
+
+class Browser:
+    def __init__(self, driver, browser_id):
+        self.driver = driver
+        self.id = browser_id
+        self.pages = 0
+        self.started = time.time()
+        self.baseline_rss = process_tree_rss(driver)
+        self.rss = self.baseline_rss
+
+    @property
+    def captchas(self):
+        return getattr(self.driver, "crawl_captchas", 0)
+
+    def recycle_reason(self):
+        if self.pages >= RECYCLE_MAX_PAGES:
+            return f"обслужено {self.pages} страниц"
+        if self.pages >= RECYCLE_CAPTCHA_MIN_PAGES and self.captchas / self.pages >= RECYCLE_CAPTCHA_RATE:
+            return f"доля капч {self.captchas}/{self.pages}"
+        if self.baseline_rss is not None and self.pages % RSS_CHECK_EVERY == 0:
+            self.rss = process_tree_rss(self.driver) or self.rss
+            growth_mb = (self.rss - self.baseline_rss) / 2 ** 20
+            if growth_mb >= RECYCLE_RSS_GROWTH_MB:
+                return f"рост памяти на {growth_mb:.0f} МБ"
+        return None
+
+
+class BrowserPool:
+    # Держит заранее запущенные запасные браузеры и меняет рабочий экземпляр
+    # по измеренным признакам деградации, а не через фиксированное число страниц
+    def __init__(self, factory, spares=1):
+        self.factory = factory
+        self.spares = spares
+        self.ready = queue.Queue()
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.launching = 0
+        self.launchers = []
+        self.closed = False
+        self.recycled = 0
+        self.retirer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="browser-retire")
+        if psutil is None:
+            logger.info("psutil не установлен, память браузеров не отслеживается")
+
+    def _launch(self):
+        try:
+            driver = self.factory()
+        except Exception as e:
+            logger.error(f"Не удалось запустить браузер: {str(e)}")
+            return None
+        with self.lock:
+            browser = Browser(driver, self.next_id)
+            self.next_id += 1
+        logger.info(f"Браузер {browser.id} запущен")
+        return browser
+
+    def _launch_spare(self):
+        try:
+            browser = self._launch()
+            if browser is None:
+                return
+            if self.closed:
+                self._quit(browser)
+            else:
+                self.ready.put(browser)
+        finally:
+            with self.lock:
+                self.launching -= 1
+
+    def _top_up(self):
+        with self.lock:
+            if self.closed:
+                return
+            missing = self.spares - self.ready.qsize() - self.launching
+            self.launching += max(0, missing)
+            self.launchers = [thread for thread in self.launchers if thread.is_alive()]
+            for _ in range(max(0, missing)):
+                thread = threading.Thread(target=self._launch_spare, name="browser-spare", daemon=True)
+                thread.start()
+                self.launchers.append(thread)
+
+    def prelaunch(self, count):
+        with ThreadPoolExecutor(max_workers=max(1, count)) as executor:
+            for browser in executor.map(lambda _: self._launch(), range(count)):
+                if browser is not None:
+                    self.ready.put(browser)
+        self._top_up()
+
+    def acquire(self):
+        try:
+            browser = self.ready.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                launching = self.launching
+            browser = None
+            if launching:
+                try:
+                    browser = self.ready.get(timeout=60)
+                except queue.Empty:
+                    pass
+            browser = browser or self._launch()
+            if browser is None:
+                raise RuntimeError("Не удалось получить браузер из пула")
+        self._top_up()
+        return browser
+
+    def after_page(self, browser):
+        browser.pages += 1
+        reason = browser.recycle_reason()
+        if not reason:
+            return browser
+        logger.info(f"Браузер {browser.id} пересоздается: {reason}")
+        self.recycled += 1
+        self.retirer.submit(self._quit, browser)
+        return self.acquire()
+
+    def _quit(self, browser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.debug(f"Ошибка при закрытии браузера {browser.id}: {str(e)}")
+
+    def release(self, browser):
+        self._quit(browser)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            launchers = list(self.launchers)
+        # Запускаемые запасные браузеры дожидаются, чтобы после закрытия пула ни один не остался открытым
+        for thread in launchers:
+            thread.join()
+        while True:
+            try:
+                self._quit(self.ready.get_nowait())
+            except queue.Empty:
+                break
+        self.retirer.shutdown(wait=True)
+        logger.info(f"Пул браузеров закрыт, пересозданий: {self.recycled}")
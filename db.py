@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Единые настройки подключения к PostgreSQL для парсера и GUI
+DB_CONFIG = {
+    "dbname": os.environ.get("PHONES_DB_NAME", "Phones"),
+    "user": os.environ.get("PHONES_DB_USER", "postgres"),
+    "password": os.environ.get("PHONES_DB_PASSWORD", "12345"),
+    "host": os.environ.get("PHONES_DB_HOST", "localhost"),
+    "port": os.environ.get("PHONES_DB_PORT", "5432"),
+    "client_encoding": "UTF8"
+}
+
+DB_POOL_MIN = 1
+DB_POOL_MAX = 10
+
+# Частые запросы, которые готовятся на сервере один раз на соединение
+PREPARED_STATEMENTS = {
+    "find_product": ("text, text", """
+        SELECT id FROM products WHERE name = $1 AND brand = $2
+    """),
+    "phone_specs": ("integer", """
+        SELECT p.name, p.brand, ps.screen_size, ps.resolution, ps.camera_mp,
+               ps.battery, ps.processor, ps.ram, ps.storage
+        FROM products p
+        JOIN product_specs ps ON p.id = ps.product_id
+        WHERE p.id = $1
+    """),
+    "phone_prices": ("integer", """
+        SELECT p.name, s.name, pr.price, pr.last_updated
+        FROM products p
+        JOIN prices pr ON p.id = pr.product_id
+        JOIN stores s ON pr.store_id = s.id
+        WHERE p.id = $1
+        ORDER BY pr.price
+    """),
+    "price_trend": ("integer, integer", """
+        SELECT r.day, s.name, r.min_price, r.max_price,
+               round(r.sum_price::numeric / r.observations, 2), r.last_price
+        FROM price_daily_rollup r
+        JOIN stores s ON s.id = r.store_id
+        WHERE r.product_id = $1 AND r.day >= CURRENT_DATE - $2
+        ORDER BY r.day DESC, s.name
+    """),
+    "price_summary": ("integer, integer", """
+        SELECT s.name, min(r.min_price), max(r.max_price),
+               round(sum(r.sum_price)::numeric / sum(r.observations), 2),
+               (array_agg(r.last_price ORDER BY r.day DESC))[1]
+        FROM price_daily_rollup r
+        JOIN stores s ON s.id = r.store_id
+        WHERE r.product_id = $1 AND r.day >= CURRENT_DATE - $2
+        GROUP BY s.name
+        ORDER BY s.name
+    """),
+    "list_smartphones": ("", """
+        SELECT p.id, p.name, p.brand, p.category, p.created_at
+        FROM products p
+        WHERE p.category = 'Smartphone'
+        ORDER BY p.name
+    """),
+}
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    # Соединение помнит, какие запросы на нем уже подготовлены
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+_pool = None
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, connection_factory=PooledConnection, **DB_CONFIG)
+            logger.info(f"Создан пул соединений с базой {DB_CONFIG['dbname']} (до {DB_POOL_MAX})")
+        return _pool
+
+
+def get_connection():
+    # Ждет свободное соединение, а не падает при исчерпании пула
+    _pool_slots.acquire()
+    try:
+        return get_pool().getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+
+def release_connection(conn):
+    try:
+        broken = conn.closed != 0
+        if not broken and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        get_pool().putconn(conn, close=broken)
+    finally:
+        _pool_slots.release()
+
+
+@contextmanager
+def connection():
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def execute_prepared(cursor, name, params=()):
+    conn = cursor.connection
+    if name not in conn.prepared:
+        types, query = PREPARED_STATEMENTS[name]
+        signature = f" ({types})" if types else ""
+        cursor.execute(f"PREPARE {name}{signature} AS {query}")
+        conn.prepared.add(name)
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+
+def list_smartphones():
+    with connection() as conn, conn.cursor() as cursor:
+        execute_prepared(cursor, "list_smartphones")
+        return cursor.fetchall()
+
+
+def fetch_phone_specs(product_id):
+    with connection() as conn, conn.cursor() as cursor:
+        execute_prepared(cursor, "phone_specs", (product_id,))
+        return cursor.fetchone()
+
+
+def fetch_phone_prices(product_id):
+    with connection() as conn, conn.cursor() as cursor:
+        execute_prepared(cursor, "phone_prices", (product_id,))
+        return cursor.fetchall()
+
+
+def fetch_price_trend(product_id, days=90):
+    with connection() as conn, conn.cursor() as cursor:
+        execute_prepared(cursor, "price_trend", (product_id, days))
+        return cursor.fetchall()
+
+
+def fetch_price_summary(product_id, days=90):
+    with connection() as conn, conn.cursor() as cursor:
+        execute_prepared(cursor, "price_summary", (product_id, days))
+        return cursor.fetchall()
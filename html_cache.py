@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "html_cache"
+
+# Время жизни записей в секундах по типу страницы
+CACHE_TTL = {
+    "catalog": 6 * 3600,
+    "product": 7 * 24 * 3600,
+}
+
+# Параметры, которые не влияют на содержимое страницы
+IGNORED_QUERY_PARAMS = {"utm_source", "utm_medium", "utm_campaign", "utm_content", "utm_term",
+                        "clid", "from", "track", "cpa", "cpc", "do-waremd5", "sku_id_from"}
+
+
+def normalize_url(url):
+    parts = urllib.parse.urlsplit(url.strip())
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in IGNORED_QUERY_PARAMS]
+    query.sort()
+    path = parts.path.rstrip("/") or "/"
+    return urllib.parse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path,
+                                    urllib.parse.urlencode(query), ""))
+
+
+def page_type(url):
+    return "catalog" if "catalog" in url.lower() else "product"
+
+
+class HtmlCache:
+    # Индекс по нормализованному URL указывает на сжатый файл, адресуемый хешем содержимого
+    def __init__(self, root=CACHE_DIR, ttl=None):
+        self.root = root
+        self.ttl = {**CACHE_TTL, **(ttl or {})}
+        self.index_dir = os.path.join(root, "index")
+        self.objects_dir = os.path.join(root, "objects")
+        os.makedirs(self.index_dir, exist_ok=True)
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def _key(self, url):
+        return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def _index_path(self, key):
+        return os.path.join(self.index_dir, key[:2], f"{key}.json")
+
+    def _object_path(self, content_hash):
+        return os.path.join(self.objects_dir, content_hash[:2], f"{content_hash}.html.gz")
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get_entry(self, url):
+        try:
+            with open(self._index_path(self._key(url)), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, url, allow_stale=False):
+        entry = self.get_entry(url)
+        if not entry:
+            return None
+        age = time.time() - entry["fetched_at"]
+        if not allow_stale and age > self.ttl.get(entry["page_type"], 0):
+            logger.debug(f"Запись кэша устарела ({age:.0f} с): {url}")
+            return None
+        try:
+            with gzip.open(self._object_path(entry["content_hash"]), "rt", encoding="utf-8") as f:
+                html = f.read()
+        except OSError as e:
+            logger.warning(f"Не удалось прочитать кэш для {url}: {str(e)}")
+            return None
+        logger.info(f"HTML взят из кэша ({age / 60:.0f} мин): {url}")
+        return html
+
+    def put(self, url, html):
+        data = html.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        object_path = self._object_path(content_hash)
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, gzip.compress(data, compresslevel=6))
+        entry = {
+            "url": url,
+            "normalized_url": normalize_url(url),
+            "page_type": page_type(url),
+            "fetched_at": time.time(),
+            "content_hash": content_hash,
+            "size": len(data),
+        }
+        self._write_atomic(self._index_path(self._key(url)),
+                           json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+    def entries(self, kind=None):
+        for dirpath, _, filenames in os.walk(self.index_dir):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(dirpath, filename), "r", encoding="utf-8") as f:
+                        entry = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if kind is None or entry["page_type"] == kind:
+                    yield entry
+
+    def prune(self, max_age=None):
+        # Удаляет записи индекса старше времени жизни (или max_age секунд), затем файлы
+        # содержимого, на которые не ссылается ни одна оставшаяся запись. Запускать вне
+        # обхода: файл, записанный до своей записи индекса, был бы удален как лишний
+        now = time.time()
+        referenced = set()
+        entries_removed = objects_removed = freed = 0
+        for dirpath, _, filenames in os.walk(self.index_dir):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        entry = json.load(f)
+                    limit = max_age if max_age is not None else self.ttl.get(entry["page_type"], 0)
+                    expired = now - entry["fetched_at"] > limit
+                except (OSError, ValueError, KeyError):
+                    entry, expired = None, True
+                if expired:
+                    os.remove(path)
+                    entries_removed += 1
+                else:
+                    referenced.add(entry["content_hash"])
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            for filename in filenames:
+                if filename.endswith(".html.gz") and filename[:-len(".html.gz")] not in referenced:
+                    path = os.path.join(dirpath, filename)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    objects_removed += 1
+        logger.info(f"Очистка кэша: удалено {entries_removed} записей и {objects_removed} файлов, "
+                    f"освобождено {freed / 2 ** 20:.1f} МБ")
+        return entries_removed, objects_removed
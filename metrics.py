@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "phones_crawl"
+
+# Границы корзин гистограмм длительности этапов, в секундах
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+METRIC_HELP = {
+    "stage_seconds": "Длительность этапа обхода",
+    "pages_total": "Загруженные страницы",
+    "html_bytes_total": "Объем полученного HTML в символах",
+    "network_bytes_total": "Трафик браузера по журналу performance",
+    "failures_total": "Неудачные попытки загрузки по классам",
+    "products_saved_total": "Товары, сохраненные в базу",
+    "spec_pages_total": "Товары, для которых загружались характеристики",
+    "spec_fields_filled_total": "Заполненные поля характеристик",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        # Оценка по верхней границе корзины, в которую попадает квантиль
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def counter(self, name, **labels):
+        # Сумма по всем сериям метрики, у которых совпадают переданные метки
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(value for (key, series), value in self.counters.items()
+                       if key == name and wanted <= set(series))
+
+    def counters_by_label(self, name, label):
+        result = {}
+        with self.lock:
+            for (key, labels), value in self.counters.items():
+                if key == name:
+                    label_value = dict(labels).get(label)
+                    result[label_value] = result.get(label_value, 0) + value
+        return result
+
+    def render_prometheus(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+        described = set()
+        for (name, labels), value in counters:
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {full_name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {full_name} counter")
+            lines.append(f"{full_name}{label_text(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {full_name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {full_name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{full_name}_bucket{label_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{full_name}_bucket{label_text(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{full_name}_sum{label_text(labels)} {histogram.sum:.6f}")
+            lines.append(f"{full_name}_count{label_text(labels)} {histogram.count}")
+        elapsed = time.time() - self.started
+        lines.append(f"# TYPE {METRIC_PREFIX}_elapsed_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_elapsed_seconds {elapsed:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # Файл подменяется целиком, чтобы textfile collector не прочитал его наполовину
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        elapsed = max(time.time() - self.started, 1e-6)
+        with self.lock:
+            histograms = dict(self.histograms)
+        stages = {}
+        for (name, labels), histogram in sorted(histograms.items()):
+            if name != "stage_seconds":
+                continue
+            stages[dict(labels)["stage"]] = {
+                "count": histogram.count,
+                "total_s": round(histogram.sum, 3),
+                "mean_s": round(histogram.sum / histogram.count, 3) if histogram.count else 0.0,
+                "p50_s": histogram.quantile(0.5),
+                "p95_s": histogram.quantile(0.95),
+                "max_s": round(histogram.max, 3),
+            }
+        pages = self.counter("pages_total")
+        browser_loads = self.counter("pages_total", source="browser") + self.counter("failures_total")
+        spec_pages = self.counter("spec_pages_total")
+        fill = self.counters_by_label("spec_fields_filled_total", "field")
+        return {
+            "elapsed_s": round(elapsed, 1),
+            "pages": pages,
+            "pages_per_min": round(pages / elapsed * 60, 2),
+            "pages_by_source": self.counters_by_label("pages_total", "source"),
+            "html_bytes": self.counter("html_bytes_total"),
+            "network_bytes": self.counter("network_bytes_total"),
+            "failures": self.counters_by_label("failures_total", "kind"),
+            "captcha_rate": round(self.counter("failures_total", kind="captcha") / browser_loads, 4)
+            if browser_loads else 0.0,
+            "products_saved": self.counter("products_saved_total"),
+            "spec_fill_rate": {field: round(count / spec_pages, 4) for field, count in sorted(fill.items())}
+            if spec_pages else {},
+            "stages": stages,
+        }
+
+    def write_summary(self, path):
+        summary = self.summary()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info(f"Сводка метрик: {summary['pages']} страниц, {summary['pages_per_min']} стр/мин, "
+                    f"доля капч {summary['captcha_rate']:.1%}; записана в {path}")
+        return summary
+
+
+METRICS = Metrics()
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Миграция: номер версии, описание, шаги (SQL-строки или функции от курсора) и
+# признак concurrent — такие шаги выполняются вне транзакции (CREATE INDEX CONCURRENTLY)
+Migration = namedtuple("Migration", ["version", "description", "steps", "concurrent"])
+
+MIGRATION_LOCK_KEY = 7203114
+
+
+def create_index_concurrently(name, definition, unique=False):
+    # Незавершенная сборка CONCURRENTLY оставляет невалидный индекс, который
+    # IF NOT EXISTS молча пропустит, поэтому такой индекс сначала удаляется
+    def step(cursor):
+        cursor.execute("""
+            SELECT NOT i.indisvalid
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND pg_catalog.pg_table_is_visible(c.oid)
+        """, (name,))
+        row = cursor.fetchone()
+        if row and row[0]:
+            logger.warning(f"Удаляем невалидный индекс {name}")
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        logger.info(f"Строим индекс {name}")
+        cursor.execute(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+    return step
+
+
+def promote_index_to_constraint(table, name):
+    def step(cursor):
+        cursor.execute("SELECT 1 FROM pg_constraint WHERE conname = %s", (name,))
+        if not cursor.fetchone():
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}")
+    return step
+
+
+PRICE_DAILY_ROLLUP_TABLE = """
+    CREATE TABLE IF NOT EXISTS price_daily_rollup (
+        product_id INTEGER NOT NULL,
+        store_id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        min_price INTEGER NOT NULL,
+        max_price INTEGER NOT NULL,
+        sum_price BIGINT NOT NULL,
+        observations INTEGER NOT NULL,
+        last_price INTEGER NOT NULL,
+        last_recorded_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        CONSTRAINT price_daily_rollup_pkey PRIMARY KEY (product_id, store_id, day),
+        CONSTRAINT fk_price_daily_rollup_product FOREIGN KEY (product_id) REFERENCES products(id),
+        CONSTRAINT fk_price_daily_rollup_store FOREIGN KEY (store_id) REFERENCES stores(id)
+    );
+"""
+
+
+def rollup_backfill(source):
+    return f"""
+        INSERT INTO price_daily_rollup (product_id, store_id, day, min_price, max_price, sum_price,
+                                        observations, last_price, last_recorded_at)
+        SELECT product_id, store_id, recorded_at::date, min(price), max(price), sum(price), count(*),
+               (array_agg(price ORDER BY recorded_at DESC, id DESC))[1], max(recorded_at)
+        FROM {source}
+        GROUP BY product_id, store_id, recorded_at::date
+        ON CONFLICT (product_id, store_id, day) DO NOTHING;
+    """
+
+
+MIGRATIONS = [
+    Migration(1, "базовые таблицы", [
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            category TEXT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stores (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            url TEXT NOT NULL
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS prices (
+            id SERIAL PRIMARY KEY,
+            product_id INTEGER NOT NULL,
+            store_id INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            last_updated TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT fk_prices_product FOREIGN KEY (product_id) REFERENCES products(id),
+            CONSTRAINT fk_prices_store FOREIGN KEY (store_id) REFERENCES stores(id)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS price_history (
+            id SERIAL PRIMARY KEY,
+            product_id INTEGER NOT NULL,
+            store_id INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            recorded_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+            CONSTRAINT fk_price_history_product FOREIGN KEY (product_id) REFERENCES products(id),
+            CONSTRAINT fk_price_history_store FOREIGN KEY (store_id) REFERENCES stores(id)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS product_specs (
+            id SERIAL PRIMARY KEY,
+            product_id INTEGER NOT NULL,
+            screen_size DOUBLE PRECISION,
+            resolution TEXT,
+            camera_mp INTEGER,
+            battery INTEGER,
+            processor TEXT,
+            ram INTEGER,
+            storage INTEGER,
+            CONSTRAINT fk_product_specs_product FOREIGN KEY (product_id) REFERENCES products(id),
+            CONSTRAINT unique_product_id UNIQUE (product_id)
+        );
+        """,
+    ], False),
+    Migration(2, "свежесть характеристик и контрольные точки обхода", [
+        "ALTER TABLE product_specs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE;",
+        """
+        CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+            run_key TEXT PRIMARY KEY,
+            last_page INTEGER NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        );
+        """,
+    ], False),
+    Migration(3, "удаление дублей товаров и цен перед уникальными ключами", [
+        """
+        CREATE TEMP TABLE product_duplicates ON COMMIT DROP AS
+        SELECT id, keep_id FROM (
+            SELECT id, min(id) OVER (PARTITION BY name, brand) AS keep_id FROM products
+        ) ranked
+        WHERE id <> keep_id;
+        """,
+        """
+        UPDATE price_history h SET product_id = d.keep_id
+        FROM product_duplicates d WHERE h.product_id = d.id;
+        """,
+        """
+        DELETE FROM product_specs s
+        USING product_duplicates d
+        WHERE s.product_id = d.id
+          AND (EXISTS (SELECT 1 FROM product_specs k WHERE k.product_id = d.keep_id)
+               OR s.id <> (SELECT max(s2.id) FROM product_specs s2
+                           JOIN product_duplicates d2 ON d2.id = s2.product_id
+                           WHERE d2.keep_id = d.keep_id));
+        """,
+        """
+        UPDATE product_specs s SET product_id = d.keep_id
+        FROM product_duplicates d WHERE s.product_id = d.id;
+        """,
+        """
+        UPDATE prices p SET product_id = d.keep_id
+        FROM product_duplicates d WHERE p.product_id = d.id;
+        """,
+        """
+        DELETE FROM prices p
+        USING prices newer
+        WHERE p.product_id = newer.product_id AND p.store_id = newer.store_id
+          AND (newer.last_updated, newer.id) > (p.last_updated, p.id);
+        """,
+        "DELETE FROM products p USING product_duplicates d WHERE p.id = d.id;",
+    ], False),
+    Migration(4, "уникальные ключи products (name, brand) и prices (product_id, store_id)", [
+        create_index_concurrently("ux_products_name_brand", "products (name, brand)", unique=True),
+        promote_index_to_constraint("products", "ux_products_name_brand"),
+        create_index_concurrently("ux_prices_product_store", "prices (product_id, store_id)", unique=True),
+        promote_index_to_constraint("prices", "ux_prices_product_store"),
+    ], True),
+    Migration(5, "индексы для истории цен и списка смартфонов в GUI", [
+        create_index_concurrently("ix_price_history_product_recorded", "price_history (product_id, recorded_at)"),
+        create_index_concurrently("ix_products_category_name", "products (category, name)"),
+    ], True),
+    Migration(6, "помесячное секционирование истории цен и хранение только изменений", [
+        """
+        ALTER TABLE price_history RENAME TO price_history_legacy;
+        ALTER INDEX price_history_pkey RENAME TO price_history_legacy_pkey;
+        ALTER INDEX IF EXISTS ix_price_history_product_recorded RENAME TO ix_price_history_legacy_product_recorded;
+        ALTER TABLE price_history_legacy RENAME CONSTRAINT fk_price_history_product TO fk_price_history_legacy_product;
+        ALTER TABLE price_history_legacy RENAME CONSTRAINT fk_price_history_store TO fk_price_history_legacy_store;
+        """,
+        """
+        CREATE TABLE price_history (
+            id INTEGER NOT NULL DEFAULT nextval('price_history_id_seq'),
+            product_id INTEGER NOT NULL,
+            store_id INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            recorded_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+            CONSTRAINT price_history_pkey PRIMARY KEY (id, recorded_at),
+            CONSTRAINT fk_price_history_product FOREIGN KEY (product_id) REFERENCES products(id),
+            CONSTRAINT fk_price_history_store FOREIGN KEY (store_id) REFERENCES stores(id)
+        ) PARTITION BY RANGE (recorded_at);
+        """,
+        "ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id;",
+        "CREATE TABLE price_history_default PARTITION OF price_history DEFAULT;",
+        "CREATE INDEX ix_price_history_product_recorded ON price_history (product_id, recorded_at);",
+        """
+        CREATE OR REPLACE FUNCTION ensure_price_history_partition(month_start DATE) RETURNS VOID AS $$
+        DECLARE
+            start_at TIMESTAMP := date_trunc('month', month_start);
+            end_at TIMESTAMP := date_trunc('month', month_start) + INTERVAL '1 month';
+            partition_name TEXT := 'price_history_' || to_char(month_start, 'YYYY_MM');
+        BEGIN
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN;
+            END IF;
+            PERFORM pg_advisory_xact_lock(hashtext('price_history_partitions'));
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN;
+            END IF;
+            EXECUTE format('CREATE TABLE %I (LIKE price_history INCLUDING DEFAULTS)', partition_name);
+            -- Строки месяца, попавшие в секцию по умолчанию, переносятся до подключения секции
+            EXECUTE format('WITH moved AS (DELETE FROM price_history_default WHERE recorded_at >= %L AND recorded_at < %L RETURNING *) '
+                           'INSERT INTO %I SELECT * FROM moved', start_at, end_at, partition_name);
+            EXECUTE format('ALTER TABLE price_history ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, start_at, end_at);
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        """
+        SELECT ensure_price_history_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(recorded_at) FROM price_history_legacy), NOW())),
+            date_trunc('month', NOW() + INTERVAL '1 month'),
+            INTERVAL '1 month'
+        ) AS month;
+        """,
+        """
+        INSERT INTO price_history (id, product_id, store_id, price, recorded_at)
+        SELECT id, product_id, store_id, price, recorded_at
+        FROM (
+            SELECT h.*, lag(price) OVER (PARTITION BY product_id, store_id ORDER BY recorded_at, id) AS previous_price
+            FROM price_history_legacy h
+        ) changes
+        WHERE previous_price IS DISTINCT FROM price;
+        """,
+        # Дневные агрегаты строятся по всем наблюдениям до удаления старой истории
+        PRICE_DAILY_ROLLUP_TABLE,
+        rollup_backfill("price_history_legacy"),
+        "DROP TABLE price_history_legacy;",
+    ], False),
+    Migration(7, "дневные агрегаты цен", [
+        PRICE_DAILY_ROLLUP_TABLE,
+        # Базы, прошедшие миграцию 6 до появления агрегатов, заполняются по истории только
+        # из изменений: число наблюдений и среднее за такие прошлые дни занижены до числа
+        # сохраненных изменений. Базы, где миграция 6 идет сейчас, заполнены ей по полной истории
+        rollup_backfill("price_history"),
+    ], False),
+]
+
+
+def run_step(cursor, step):
+    if callable(step):
+        step(cursor)
+    else:
+        cursor.execute(step)
+
+
+def current_version(cursor):
+    cursor.execute("SELECT COALESCE(max(version), 0) FROM schema_migrations")
+    return cursor.fetchone()[0]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW()
+            );
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        for migration in sorted(migrations, key=lambda m: m.version):
+            if migration.version in applied:
+                continue
+            logger.info(f"Применяем миграцию {migration.version}: {migration.description}")
+            if migration.concurrent:
+                for step in migration.steps:
+                    run_step(cursor, step)
+                cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                               (migration.version, migration.description))
+            else:
+                conn.autocommit = False
+                try:
+                    for step in migration.steps:
+                        run_step(cursor, step)
+                    cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                                   (migration.version, migration.description))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.autocommit = True
+        version = current_version(cursor)
+        logger.info(f"Версия схемы базы данных: {version}")
+        return version
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        cursor.close()
+        conn.autocommit = autocommit
+
+
+if __name__ == "__main__":
+    from db import close_pool, connection
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    with connection() as conn:
+        migrate(conn)
+    close_pool()
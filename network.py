@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Какие группы ресурсов блокировать в браузерах обхода
+RESOURCE_POLICY = {
+    "images": True,
+    "media": True,
+    "fonts": True,
+    "trackers": True,
+}
+
+def extension_patterns(*extensions):
+    # CDN площадки отдает ресурсы с параметрами (foo.png?v=3), поэтому для каждого
+    # расширения есть и шаблон с окончанием адреса, и шаблон со строкой запроса
+    return [pattern for extension in extensions for pattern in (f"*.{extension}", f"*.{extension}?*")]
+
+
+BLOCKED_URL_PATTERNS = {
+    "images": extension_patterns("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico")
+              + ["*avatars.mds.yandex.net/get-mpic*", "*avatars.mds.yandex.net/get-marketpic*"],
+    "media": extension_patterns("mp4", "webm", "m3u8", "mp3") + ["*video.yandex*", "*strm.yandex.ru*"],
+    "fonts": extension_patterns("woff", "woff2", "ttf", "otf", "eot"),
+    "trackers": ["*mc.yandex.ru*", "*an.yandex.ru*", "*yandex.ru/ads/*", "*adfox*", "*ads.adfox.ru*",
+                 "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+                 "*top-fwz1.mail.ru*", "*vk.com/rtrg*"],
+}
+
+# Средний размер заблокированного ресурса по типу для оценки сэкономленного трафика
+ESTIMATED_RESOURCE_BYTES = {
+    "Image": 45_000,
+    "Media": 750_000,
+    "Font": 60_000,
+    "Script": 40_000,
+    "XHR": 5_000,
+    "Fetch": 5_000,
+    "Ping": 500,
+}
+DEFAULT_RESOURCE_BYTES = 10_000
+
+# Ответы, которые режим перехвата читает как данные страницы
+JSON_RESOURCE_TYPES = {"XHR", "Fetch"}
+
+NETWORK_TOTALS = {"pages": 0, "requests": 0, "bytes": 0, "blocked": 0, "bytes_saved": 0}
+_totals_lock = threading.Lock()
+
+
+def blocked_url_patterns(policy=None):
+    policy = RESOURCE_POLICY if policy is None else policy
+    patterns = []
+    for group, enabled in policy.items():
+        if enabled:
+            patterns.extend(BLOCKED_URL_PATTERNS.get(group, []))
+    return patterns
+
+
+def apply_resource_policy(driver, policy=None):
+    patterns = blocked_url_patterns(policy)
+    driver.execute_cdp_cmd("Network.enable", {})
+    if patterns:
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    return patterns
+
+
+def drain_performance_log(driver):
+    # Журнал performance очищается при чтении, поэтому читается в одном месте
+    try:
+        entries = driver.get_log("performance")
+    except Exception as e:
+        logger.debug(f"Журнал performance недоступен: {str(e)[:200]}")
+        return []
+    events = []
+    for entry in entries:
+        try:
+            events.append(json.loads(entry["message"])["message"])
+        except (KeyError, ValueError):
+            continue
+    return events
+
+
+def summarize_network_events(events):
+    stats = {"requests": 0, "bytes": 0, "blocked": 0, "bytes_saved": 0}
+    for event in events:
+        method = event.get("method")
+        params = event.get("params", {})
+        if method == "Network.loadingFinished":
+            stats["requests"] += 1
+            stats["bytes"] += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            stats["blocked"] += 1
+            stats["bytes_saved"] += ESTIMATED_RESOURCE_BYTES.get(params.get("type"), DEFAULT_RESOURCE_BYTES)
+    return stats
+
+
+def record_page_network_stats(events, url):
+    stats = summarize_network_events(events)
+    with _totals_lock:
+        NETWORK_TOTALS["pages"] += 1
+        for key, value in stats.items():
+            NETWORK_TOTALS[key] += value
+    METRICS.inc("network_bytes_total", stats["bytes"])
+    logger.info(f"Сеть: {stats['requests']} запросов, {stats['bytes'] / 1024:.0f} КБ, "
+                f"заблокировано {stats['blocked']} (~{stats['bytes_saved'] / 1024:.0f} КБ): {url}")
+    return stats
+
+
+def collect_page_network(driver, url):
+    # Забирает события страницы из журнала и при необходимости учитывает трафик
+    if not getattr(driver, "crawl_performance_log", False):
+        return []
+    events = drain_performance_log(driver)
+    if getattr(driver, "crawl_network_stats", False):
+        record_page_network_stats(events, url)
+    return events
+
+
+def json_response_ids(events):
+    responses = {}
+    finished = set()
+    for event in events:
+        method = event.get("method")
+        params = event.get("params", {})
+        if method == "Network.responseReceived" and params.get("type") in JSON_RESOURCE_TYPES:
+            response = params.get("response", {})
+            if "json" in response.get("mimeType", "").lower():
+                responses[params.get("requestId")] = response.get("url", "")
+        elif method == "Network.loadingFinished":
+            finished.add(params.get("requestId"))
+    return [(request_id, url) for request_id, url in responses.items() if request_id in finished]
+
+
+def decode_response_body(body):
+    text = body.get("body", "")
+    if body.get("base64Encoded"):
+        text = base64.b64decode(text).decode("utf-8", errors="replace")
+    return json.loads(text)
+
+
+def capture_json_responses(driver, events):
+    payloads = []
+    for request_id, url in json_response_ids(events):
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            payloads.append({"url": url, "payload": decode_response_body(body)})
+        except ValueError:
+            logger.debug(f"Ответ не является JSON: {url}")
+        except Exception as e:
+            # Тело могло быть вытеснено из буфера браузера
+            logger.debug(f"Не удалось получить тело ответа {url}: {str(e)[:200]}")
+    return payloads
+
+
+def save_capture(directory, page_url, payloads):
+    os.makedirs(directory, exist_ok=True)
+    name = hashlib.sha256(page_url.encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(directory, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "url": page_url,
+            "captured_at": datetime.now().isoformat(timespec="seconds"),
+            "responses": payloads,
+        }, f, ensure_ascii=False)
+    return path
+
+
+def load_capture(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["responses"]
+
+
+def log_network_totals():
+    with _totals_lock:
+        totals = dict(NETWORK_TOTALS)
+    if totals["pages"]:
+        logger.info(f"Сеть за обход: {totals['pages']} страниц, {totals['requests']} запросов, "
+                    f"{totals['bytes'] / 2 ** 20:.1f} МБ загружено, {totals['blocked']} запросов заблокировано, "
+                    f"сэкономлено ~{totals['bytes_saved'] / 2 ** 20:.1f} МБ")
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Извлечение данных прямо в странице: по WebDriver передаются только
+# найденные пары, тексты скриптов с JSON-данными и карточки, а не весь HTML документа
+SPEC_PAIRS_JS = """
+    var pairs = [];
+    var rows = document.querySelectorAll('table tr');
+    for (var i = 0; i < rows.length; i++) {
+        var cols = rows[i].querySelectorAll('td, th');
+        if (cols.length >= 2) {
+            pairs.push([cols[0].textContent.trim(), cols[1].textContent.trim()]);
+        }
+    }
+    var selectors = arguments[0];
+    for (var s = 0; s < selectors.length; s++) {
+        var blocks = document.querySelectorAll(selectors[s]);
+        for (var b = 0; b < blocks.length; b++) {
+            var terms = blocks[b].querySelectorAll('dt');
+            for (var t = 0; t < terms.length; t++) {
+                var value = terms[t].nextElementSibling;
+                if (value && value.tagName === 'DD') {
+                    pairs.push([terms[t].textContent.trim(), value.textContent.trim()]);
+                }
+            }
+        }
+    }
+    var jsonTypes = arguments[1];
+    var assignment = /(?:__[A-Z_]+__|[Ss]tate|[Dd]ata|[Pp]rops)\s*=\s*[{\[]/;
+    var scripts = [];
+    var nodes = document.querySelectorAll('script:not([src])');
+    for (var n = 0; n < nodes.length; n++) {
+        var type = (nodes[n].getAttribute('type') || '').toLowerCase();
+        var text = nodes[n].textContent;
+        if (text && (jsonTypes.indexOf(type) >= 0 || assignment.test(text) || /^\s*[{\[]/.test(text))) {
+            scripts.push([type, text]);
+        }
+    }
+    return {pairs: pairs, scripts: scripts};
+"""
+
+CATALOG_CARDS_JS = """
+    var cardSelectors = arguments[0], titleSelectors = arguments[1];
+    var linkSelectors = arguments[2], priceSelectors = arguments[3];
+    function first(root, selectors) {
+        for (var i = 0; i < selectors.length; i++) {
+            var found = root.querySelector(selectors[i]);
+            if (found) {
+                return found;
+            }
+        }
+        return null;
+    }
+    var items = [];
+    for (var i = 0; i < cardSelectors.length; i++) {
+        items = document.querySelectorAll(cardSelectors[i]);
+        if (items.length) {
+            break;
+        }
+    }
+    var cards = [];
+    for (var j = 0; j < items.length; j++) {
+        var title = first(items[j], titleSelectors);
+        var link = first(items[j], linkSelectors);
+        var price = first(items[j], priceSelectors);
+        if (title && link && price) {
+            cards.push({name: title.textContent, link: link.getAttribute('href') || '',
+                        price: price.textContent.trim()});
+        }
+    }
+    return cards;
+"""
+
+
+def extract_spec_pairs(driver, spec_selectors, json_script_types):
+    # Пары характеристик из разметки и тексты скриптов с JSON-данными в виде (тип, текст)
+    try:
+        found = driver.execute_script(SPEC_PAIRS_JS, spec_selectors, sorted(json_script_types)) or {}
+    except Exception as e:
+        logger.warning(f"Ошибка извлечения характеристик в странице: {str(e)[:200]}")
+        return [], []
+    return found.get("pairs") or [], found.get("scripts") or []
+
+
+def extract_catalog_cards(driver, card_selectors, title_selectors, link_selectors, price_selectors):
+    try:
+        return driver.execute_script(CATALOG_CARDS_JS, card_selectors, title_selectors,
+                                     link_selectors, price_selectors) or []
+    except Exception as e:
+        logger.warning(f"Ошибка извлечения карточек в странице: {str(e)[:200]}")
+        return []
@@ -4,38 +4,25 @@ from ttkbootstrap.constants import *
 from tkinter import messagebox, Toplevel, Checkbutton, IntVar
 from tkinter.ttk import Treeview, Scrollbar
 
-# Database connection parameters
-DB_PARAMS = {
-    "dbname": "ph",
-    "user": "postgres",
-    "password": "12345",  # Replace with your postgres password
-    "host": "localhost",
-    "port": "5432"
-}
+from db import (close_pool, connection, fetch_phone_prices, fetch_phone_specs, fetch_price_summary,
+                fetch_price_trend, list_smartphones)
 
 def connect_db():
-    """Connect to the PostgreSQL database."""
+    """Check that the shared connection pool can reach the PostgreSQL database."""
     try:
-        conn = psycopg2.connect(**DB_PARAMS)
-        return conn
+        with connection():
+            pass
     except psycopg2.Error as e:
         messagebox.showerror("Database Error", f"Error connecting to database: {e}")
         exit(1)
 
-def list_phones(conn, tree):
+def list_phones(tree):
     """List all phones in the Treeview."""
     # Clear existing items
     for item in tree.get_children():
         tree.delete(item)
 
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT p.id, p.name, p.brand, p.category, p.created_at
-            FROM products p
-            WHERE p.category = 'Smartphone'
-            ORDER BY p.name;
-        """)
-        phones = cur.fetchall()
+    phones = list_smartphones()
 
     # Configure Treeview columns
     tree["columns"] = ("ID", "Name", "Brand", "Category", "Created At")
@@ -54,23 +41,9 @@ def list_phones(conn, tree):
     for phone in phones:
         tree.insert("", END, values=phone)
 
-def get_phone_specs(conn, product_id):
-    """Get specifications for a specific phone."""
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT p.name, p.brand, ps.screen_size, ps.resolution, ps.camera_mp,
-                   ps.battery, ps.processor, ps.ram, ps.storage
-            FROM products p
-            JOIN product_specs ps ON p.id = ps.product_id
-            WHERE p.id = %s;
-        """, (product_id,))
-        return cur.fetchone()
-
-def compare_phones_dialog(conn, tree):
+def compare_phones_dialog(tree):
     """Open a dialog to select phones for comparison."""
-    with conn.cursor() as cur:
-        cur.execute("SELECT id, name FROM products WHERE category = 'Smartphone' ORDER BY name")
-        phones = cur.fetchall()
+    phones = [(phone[0], phone[1]) for phone in list_smartphones()]
 
     if len(phones) < 2:
         messagebox.showwarning("Warning", "At least two phones are required for comparison.")
@@ -97,13 +70,13 @@ def compare_phones_dialog(conn, tree):
             messagebox.showerror("Error", "Please select at least two phones.")
             return
         dialog.destroy()
-        display_comparison(conn, tree, selected_ids)
+        display_comparison(tree, selected_ids)
 
     ttk.Button(dialog, text="Compare", bootstyle=SUCCESS, command=submit).pack(pady=20)
     dialog.transient(tree.winfo_toplevel())
     dialog.grab_set()
 
-def display_comparison(conn, tree, product_ids):
+def display_comparison(tree, product_ids):
     """Display comparison of selected phones in the Treeview."""
     # Clear existing items
     for item in tree.get_children():
@@ -111,7 +84,7 @@ def display_comparison(conn, tree, product_ids):
 
     specs_data = []
     for pid in product_ids:
-        specs = get_phone_specs(conn, pid)
+        specs = fetch_phone_specs(pid)
         if not specs:
             messagebox.showerror("Error", f"Phone with ID {pid} not found.")
             return
@@ -132,7 +105,7 @@ def display_comparison(conn, tree, product_ids):
         row = [field] + [str(spec[i]) for spec in specs_data]
         tree.insert("", END, values=row)
 
-def view_prices_dialog(conn, tree):
+def view_prices_dialog(tree):
     """Open a dialog to enter phone ID for viewing prices."""
     dialog = Toplevel()
     dialog.title("View Prices")
@@ -147,7 +120,7 @@ def view_prices_dialog(conn, tree):
         try:
             product_id = int(entry.get())
             dialog.destroy()
-            display_prices(conn, tree, product_id)
+            display_prices(tree, product_id)
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid ID.")
 
@@ -155,22 +128,13 @@ def view_prices_dialog(conn, tree):
     dialog.transient(tree.winfo_toplevel())
     dialog.grab_set()
 
-def display_prices(conn, tree, product_id):
+def display_prices(tree, product_id):
     """Display prices for a specific phone in the Treeview."""
     # Clear existing items
     for item in tree.get_children():
         tree.delete(item)
 
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT p.name, s.name, pr.price, pr.last_updated
-            FROM products p
-            JOIN prices pr ON p.id = pr.product_id
-            JOIN stores s ON pr.store_id = s.id
-            WHERE p.id = %s
-            ORDER BY pr.price;
-        """, (product_id,))
-        prices = cur.fetchall()
+    prices = fetch_phone_prices(product_id)
 
     if not prices:
         messagebox.showinfo("Info", "No price data available for this phone.")
@@ -191,9 +155,58 @@ def display_prices(conn, tree, product_id):
     for price in prices:
         tree.insert("", END, values=price)
 
+def view_price_trend_dialog(tree):
+    """Open a dialog to enter phone ID for viewing the daily price trend."""
+    dialog = Toplevel()
+    dialog.title("Price Trend")
+    dialog.geometry("300x200")
+    dialog.resizable(False, False)
+
+    ttk.Label(dialog, text="Enter Phone ID:").pack(pady=10)
+    entry = ttk.Entry(dialog)
+    entry.pack(pady=10)
+
+    def submit():
+        try:
+            product_id = int(entry.get())
+            dialog.destroy()
+            display_price_trend(tree, product_id)
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid ID.")
+
+    ttk.Button(dialog, text="View Trend", bootstyle=SUCCESS, command=submit).pack(pady=20)
+    dialog.transient(tree.winfo_toplevel())
+    dialog.grab_set()
+
+def display_price_trend(tree, product_id, days=90):
+    """Display daily min/max/avg/last prices for a phone from the precomputed rollup."""
+    # Clear existing items
+    for item in tree.get_children():
+        tree.delete(item)
+
+    summary = fetch_price_summary(product_id, days)
+    trend = fetch_price_trend(product_id, days)
+
+    if not trend:
+        messagebox.showinfo("Info", "No price history available for this phone.")
+        return
+
+    # Configure Treeview columns
+    tree["columns"] = ("Day", "Store", "Min", "Max", "Avg", "Last")
+    for column in tree["columns"]:
+        tree.heading(column, text=column)
+        tree.column(column, width=100)
+    tree.column("Store", width=150)
+
+    # Insert summary rows first, then one row per day
+    for store, min_price, max_price, avg_price, last_price in summary:
+        tree.insert("", END, values=(f"Last {days} days", store, min_price, max_price, avg_price, last_price))
+    for row in trend:
+        tree.insert("", END, values=row)
+
 def main():
     """Main application function."""
-    conn = connect_db()
+    connect_db()
 
     # Create main window
     root = ttk.Window(themename="flatly")
@@ -207,11 +220,13 @@ def main():
 
     # Create buttons
     ttk.Button(frame, text="List Phones", bootstyle=PRIMARY,
-               command=lambda: list_phones(conn, tree)).pack(pady=5, fill=X)
+               command=lambda: list_phones(tree)).pack(pady=5, fill=X)
     ttk.Button(frame, text="Compare Phones", bootstyle=INFO,
-               command=lambda: compare_phones_dialog(conn, tree)).pack(pady=5, fill=X)
+               command=lambda: compare_phones_dialog(tree)).pack(pady=5, fill=X)
     ttk.Button(frame, text="View Prices", bootstyle=SUCCESS,
-               command=lambda: view_prices_dialog(conn, tree)).pack(pady=5, fill=X)
+               command=lambda: view_prices_dialog(tree)).pack(pady=5, fill=X)
+    ttk.Button(frame, text="Price Trend", bootstyle=SECONDARY,
+               command=lambda: view_price_trend_dialog(tree)).pack(pady=5, fill=X)
 
     # Create Treeview with scrollbar
     tree_frame = ttk.Frame(frame)
@@ -225,7 +240,7 @@ def main():
     tree.configure(yscrollcommand=scrollbar.set)
 
     # Run application
-    root.protocol("WM_DELETE_WINDOW", lambda: [conn.close(), root.destroy()])
+    root.protocol("WM_DELETE_WINDOW", lambda: [close_pool(), root.destroy()])
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import cProfile
+import io
+import linecache
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = "profiles"
+SAMPLE_INTERVAL = 0.01
+TRACE_FRAMES = 10
+TOP_ALLOCATIONS = 30
+TOP_FUNCTIONS = 40
+
+# Служебные кадры, которые не несут информации о работе парсера
+IGNORED_TRACE_FILES = ("<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    # Периодически снимает стеки всех потоков: cProfile видит только основной
+    # поток, а страницы товаров, предзагрузка каталога и запись в БД идут в других
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def write_collapsed(self, path):
+        # Формат свернутых стеков для flamegraph.pl, speedscope и inferno
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class CrawlProfiler:
+    def __init__(self, root=PROFILE_DIR, sample_interval=SAMPLE_INTERVAL, trace_frames=TRACE_FRAMES):
+        self.directory = os.path.join(root, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(sample_interval)
+        self.trace_frames = trace_frames
+        self.previous = None
+        self.pages = []
+        self.started = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tracemalloc.start(self.trace_frames)
+        self.sampler.start()
+        self.started = time.perf_counter()
+        self.profile.enable()
+        logger.info(f"Профилирование включено, результаты будут в {self.directory}")
+        return self
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in IGNORED_TRACE_FILES]
+            + [tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def page_boundary(self, label):
+        # Снимок памяти после страницы: прирост по строкам кода относительно предыдущего снимка
+        snapshot = self._snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        growth = []
+        if self.previous is not None:
+            growth = [stat for stat in snapshot.compare_to(self.previous, "lineno")[:5] if stat.size_diff > 0]
+        self.pages.append({
+            "label": label,
+            "elapsed": time.perf_counter() - self.started,
+            "current": current,
+            "peak": peak,
+            "growth": growth,
+        })
+        self.previous = snapshot
+        tracemalloc.reset_peak()
+        logger.info(f"Память после {label}: {current / 2 ** 20:.1f} МБ, пик {peak / 2 ** 20:.1f} МБ")
+
+    def stop(self):
+        self.profile.disable()
+        self.sampler.stop()
+        snapshot = self._snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.profile.dump_stats(os.path.join(self.directory, "crawl.pstats"))
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        with open(os.path.join(self.directory, "cpu_top.txt"), "w", encoding="utf-8") as f:
+            f.write(stream.getvalue())
+        self.sampler.write_collapsed(os.path.join(self.directory, "stacks.collapsed"))
+        self.write_memory_report(os.path.join(self.directory, "memory_top.txt"), snapshot, current, peak)
+        logger.info(f"Профиль записан в {self.directory}: {self.sampler.samples} выборок стеков, "
+                    f"память {current / 2 ** 20:.1f} МБ в конце обхода")
+        return self.directory
+
+    def write_memory_report(self, path, snapshot, current, peak):
+        lines = [f"Память в конце обхода: {current / 2 ** 20:.1f} МБ, пик после последней страницы: "
+                 f"{peak / 2 ** 20:.1f} МБ", ""]
+        lines.append("Память по страницам:")
+        for page in self.pages:
+            lines.append(f"  {page['label']:<24} {page['elapsed']:>8.1f} с  {page['current'] / 2 ** 20:>8.1f} МБ  "
+                         f"пик {page['peak'] / 2 ** 20:>8.1f} МБ")
+            for stat in page["growth"]:
+                frame = stat.traceback[0]
+                lines.append(f"      +{stat.size_diff / 1024:,.0f} КиБ  {frame.filename}:{frame.lineno}")
+        lines.append("")
+        lines.append(f"Крупнейшие размещения (top {TOP_ALLOCATIONS}, по строкам):")
+        for index, stat in enumerate(snapshot.statistics("lineno")[:TOP_ALLOCATIONS], 1):
+            frame = stat.traceback[0]
+            lines.append(f"{index:>3}. {stat.size / 1024:>10,.0f} КиБ  {stat.count:>8} блоков  "
+                         f"{frame.filename}:{frame.lineno}")
+            source = linecache.getline(frame.filename, frame.lineno).strip()
+            if source:
+                lines.append(f"       {source}")
+        lines.append("")
+        lines.append(f"Крупнейшие размещения с цепочкой вызовов (top 10, до {self.trace_frames} кадров):")
+        for stat in snapshot.statistics("traceback")[:10]:
+            lines.append(f"{stat.size / 1024:,.0f} КиБ, {stat.count} блоков")
+            lines.extend(f"    {line}" for line in stat.traceback.format())
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Параметры ожидания готовности страницы
+READY_DEADLINE = 20
+READY_QUIET = 0.75
+READY_POLL_INTERVAL = 0.25
+READY_STABLE_POLLS = 2
+
+# Прежнее поведение для оценки сэкономленного времени: шаг прокрутки 500 px
+# с паузой 1–2 с и пауза 5–8 с после клика по кнопке характеристик
+LEGACY_SCROLL_STEP_PX = 500
+LEGACY_SCROLL_PAUSE = 1.5
+LEGACY_CLICK_PAUSE = 6.5
+
+OBSERVER_JS = """
+    if (!window.__crawlReadiness) {
+        window.__crawlReadiness = {lastMutation: performance.now(), mutations: 0};
+        new MutationObserver(function () {
+            window.__crawlReadiness.lastMutation = performance.now();
+            window.__crawlReadiness.mutations += 1;
+        }).observe(document.documentElement, {childList: true, subtree: true});
+    }
+"""
+
+STATUS_JS = """
+    var selectors = arguments[0];
+    var scroll = arguments[1];
+    // Прокрутка на один экран за опрос: ленивая подгрузка срабатывает по мере
+    // появления блоков в области видимости, а не только у конца страницы
+    if (scroll) {
+        window.scrollBy(0, window.innerHeight);
+    }
+    var cards = 0;
+    for (var i = 0; i < selectors.length; i++) {
+        cards = document.querySelectorAll(selectors[i]).length;
+        if (cards) {
+            break;
+        }
+    }
+    var state = window.__crawlReadiness || {lastMutation: 0};
+    return {
+        cards: cards,
+        height: document.body.scrollHeight,
+        resources: performance.getEntriesByType('resource').length,
+        quietMs: performance.now() - state.lastMutation,
+        readyState: document.readyState,
+        atBottom: window.scrollY + window.innerHeight >= document.body.scrollHeight - 2
+    };
+"""
+
+READINESS_TOTALS = {"pages": 0, "elapsed": 0.0, "legacy": 0.0, "saved": 0.0}
+_totals_lock = threading.Lock()
+
+
+def count_matches(driver, selectors):
+    return driver.execute_script(STATUS_JS, selectors, False)["cards"]
+
+
+def wait_for_page_ready(driver, selectors, scroll=True, legacy_pause=None, deadline=READY_DEADLINE,
+                        min_cards=None):
+    # Страница готова, когда прокрутка дошла до конца, число совпадений селекторов, высота
+    # документа и число загруженных ресурсов перестают меняться, а DOM не мутирует READY_QUIET секунд.
+    # С min_cards страница готова только после роста числа совпадений сверх min_cards;
+    # если за legacy_pause они не выросли, ожидание заканчивается, как раньше после паузы
+    started = time.monotonic()
+    driver.execute_script(OBSERVER_JS)
+    previous = None
+    stable_polls = 0
+    growth_events = 0
+    status = {}
+    while time.monotonic() - started < deadline:
+        status = driver.execute_script(STATUS_JS, selectors, scroll)
+        snapshot = (status["cards"], status["height"], status["resources"])
+        if previous is not None and status["height"] > previous[1]:
+            growth_events += 1
+        quiet = (status["quietMs"] >= READY_QUIET * 1000 and status["readyState"] == "complete"
+                 and (status["atBottom"] or not scroll))
+        grown = min_cards is None or status["cards"] > min_cards
+        if not grown and legacy_pause is not None and time.monotonic() - started >= legacy_pause:
+            logger.info(f"Число элементов не выросло за {legacy_pause} с, ожидание завершено по прежней паузе")
+            break
+        if snapshot == previous and quiet and grown:
+            stable_polls += 1
+            if stable_polls >= READY_STABLE_POLLS:
+                break
+        else:
+            stable_polls = 0
+        previous = snapshot
+        time.sleep(READY_POLL_INTERVAL)
+    else:
+        logger.warning(f"Страница не стабилизировалась за {deadline} с")
+
+    elapsed = time.monotonic() - started
+    if legacy_pause is None:
+        legacy_steps = max(growth_events + 1, math.ceil(status.get("height", 0) / LEGACY_SCROLL_STEP_PX)) if scroll else 0
+        legacy = legacy_steps * LEGACY_SCROLL_PAUSE
+    else:
+        legacy = legacy_pause
+    saved = legacy - elapsed
+    with _totals_lock:
+        READINESS_TOTALS["pages"] += 1
+        READINESS_TOTALS["elapsed"] += elapsed
+        READINESS_TOTALS["legacy"] += legacy
+        READINESS_TOTALS["saved"] += saved
+    logger.info(f"Страница готова за {elapsed:.1f} с (элементов: {status.get('cards', 0)}, "
+                f"экономия ~{saved:.1f} с относительно ожидания паузами)")
+    return {"elapsed": elapsed, "legacy": legacy, "saved": saved, "cards": status.get("cards", 0)}
+
+
+def log_readiness_totals():
+    with _totals_lock:
+        totals = dict(READINESS_TOTALS)
+    if totals["pages"]:
+        logger.info(f"Ожидание готовности: {totals['pages']} страниц, {totals['elapsed']:.1f} с "
+                    f"вместо ~{totals['legacy']:.1f} с, сэкономлено ~{totals['saved']:.1f} с")
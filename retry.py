@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import logging
+import random
+import threading
+import time
+import urllib.parse
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlError(Exception):
+    kind = "error"
+
+
+class TransientError(CrawlError):
+    kind = "timeout"
+
+
+class CaptchaError(CrawlError):
+    kind = "captcha"
+
+
+class AccessBlockedError(CrawlError):
+    kind = "blocked"
+
+
+class ShortHtmlError(CrawlError):
+    kind = "short_html"
+
+
+# Число попыток и параметры экспоненциальной паузы для каждого класса сбоя
+RETRY_POLICY = {
+    "timeout": {"attempts": 3, "base": 2.0, "cap": 30.0},
+    "captcha": {"attempts": 2, "base": 20.0, "cap": 120.0},
+    "blocked": {"attempts": 1, "base": 60.0, "cap": 600.0},
+    "short_html": {"attempts": 2, "base": 3.0, "cap": 20.0},
+    "error": {"attempts": 2, "base": 5.0, "cap": 60.0},
+}
+
+# Автомат защиты хоста: доля капч и блокировок в окне последних исходов,
+# при которой все запросы к хосту приостанавливаются
+BREAKER_WINDOW = 20
+BREAKER_MIN_EVENTS = 8
+BREAKER_THRESHOLD = 0.4
+BREAKER_COOLDOWN = 120.0
+BREAKER_MAX_COOLDOWN = 1200.0
+BREAKER_FAILURE_KINDS = {"captcha", "blocked"}
+# После паузы к хосту идет один пробный запрос, остальные опрашивают его исход;
+# если проба не сообщила исход за BREAKER_PROBE_TIMEOUT секунд, пробует следующий
+BREAKER_PROBE_POLL = 0.5
+BREAKER_PROBE_TIMEOUT = 60.0
+
+
+def retry_allowed(kind, failures):
+    return failures < RETRY_POLICY.get(kind, RETRY_POLICY["error"])["attempts"]
+
+
+def backoff_delay(kind, failures):
+    # Экспоненциальная пауза с разбросом: от половины до полной величины
+    policy = RETRY_POLICY.get(kind, RETRY_POLICY["error"])
+    delay = min(policy["cap"], policy["base"] * 2 ** max(0, failures - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def host_of(url):
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+
+class HostBreaker:
+    def __init__(self):
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)
+        self.open_until = 0.0
+        self.cooldown = BREAKER_COOLDOWN
+        self.half_open = False
+        self.probe = None
+        self.probe_started = 0.0
+        self.trips = 0
+
+
+class CircuitBreaker:
+    # Общий для всех воркеров: после срабатывания каждый запрос к хосту
+    # ждет окончания паузы, затем исход одного пробного запроса решает, снять ли защиту
+    def __init__(self):
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, url):
+        host = host_of(url)
+        if host not in self.hosts:
+            self.hosts[host] = HostBreaker()
+        return host, self.hosts[host]
+
+    def record(self, url, kind=None):
+        failed = kind in BREAKER_FAILURE_KINDS
+        with self.lock:
+            host, state = self._host(url)
+            if state.half_open:
+                if state.probe != threading.get_ident():
+                    # Исход запроса, начатого до срабатывания, судьбу защиты не решает
+                    return
+                state.half_open = False
+                state.probe = None
+                if failed:
+                    state.cooldown = min(state.cooldown * 2, BREAKER_MAX_COOLDOWN)
+                    self._trip(host, state)
+                else:
+                    state.cooldown = BREAKER_COOLDOWN
+                    logger.info(f"Защита хоста {host} снята")
+                return
+            state.outcomes.append(failed)
+            if len(state.outcomes) >= BREAKER_MIN_EVENTS:
+                rate = sum(state.outcomes) / len(state.outcomes)
+                if rate >= BREAKER_THRESHOLD:
+                    self._trip(host, state, rate)
+
+    def _trip(self, host, state, rate=None):
+        state.open_until = time.monotonic() + state.cooldown
+        state.outcomes.clear()
+        state.trips += 1
+        reason = f"доля капч и блокировок {rate:.0%}" if rate is not None else "сбой после паузы"
+        logger.warning(f"Запросы к {host} приостановлены на {state.cooldown:.0f} с: {reason}")
+
+    def remaining(self, url):
+        with self.lock:
+            _, state = self._host(url)
+            now = time.monotonic()
+            wait = state.open_until - now
+            if wait > 0:
+                return wait
+            if state.open_until:
+                state.open_until = 0.0
+                state.half_open = True
+            if not state.half_open or state.probe == threading.get_ident():
+                return 0.0
+            if state.probe is None or now - state.probe_started > BREAKER_PROBE_TIMEOUT:
+                state.probe = threading.get_ident()
+                state.probe_started = now
+                return 0.0
+            return BREAKER_PROBE_POLL
+
+    def wait(self, url):
+        paused = 0.0
+        wait = self.remaining(url)
+        while wait > 0:
+            time.sleep(wait)
+            paused += wait
+            wait = self.remaining(url)
+        return paused
+
+    def trips(self):
+        with self.lock:
+            return sum(state.trips for state in self.hosts.values())
+
+
+class FailedUrls:
+    # Адреса, исчерпавшие попытки, для повторного прохода в конце обхода
+    def __init__(self):
+        self.urls = {}
+        self.lock = threading.Lock()
+
+    def add(self, url, kind):
+        with self.lock:
+            self.urls[url] = kind
+
+    def discard(self, url):
+        with self.lock:
+            self.urls.pop(url, None)
+
+    def __contains__(self, url):
+        with self.lock:
+            return url in self.urls
+
+    def __len__(self):
+        with self.lock:
+            return len(self.urls)
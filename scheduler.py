@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    # Токен-бакет с резервированием: каждый вызов занимает токен и получает
+    # время ожидания, поэтому средняя частота запросов точно равна rate
+    def __init__(self, rate_per_minute, burst=1, jitter=0.0):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.jitter = jitter
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0 and self.jitter:
+            wait *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    # Отдельный токен-бакет для каждого хоста; при сработавшей защите хоста
+    # запрос сначала ждет окончания паузы автомата
+    def __init__(self, rate_per_minute, burst=1, jitter=0.0, breaker=None):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.jitter = jitter
+        self.breaker = breaker
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate_per_minute, self.burst, self.jitter)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        paused = self.breaker.wait(url) if self.breaker else 0.0
+        wait = self.bucket(url).acquire()
+        if wait > 0:
+            logger.debug(f"Ожидание {wait:.2f} с перед запросом к {url}")
+        return paused + wait
+
+
+class CrawlScheduler:
+    # Асинхронный планировщик: раздаёт задачи свободным воркерам с ограничением
+    # одновременных задач, а блокирующая работа (Selenium, парсинг) идёт в потоках
+    def __init__(self, workers, concurrency=None):
+        self.workers = list(workers)
+        self.concurrency = min(concurrency or len(self.workers), len(self.workers))
+
+    async def _run_task(self, index, item, func, idle, semaphore, loop, executor):
+        async with semaphore:
+            worker = await idle.get()
+            try:
+                return index, await loop.run_in_executor(executor, func, worker, item)
+            finally:
+                idle.put_nowait(worker)
+
+    async def run_async(self, items, func):
+        loop = asyncio.get_running_loop()
+        idle = asyncio.Queue()
+        for worker in self.workers:
+            idle.put_nowait(worker)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawl") as executor:
+            tasks = [
+                asyncio.create_task(self._run_task(index, item, func, idle, semaphore, loop, executor))
+                for index, item in enumerate(items)
+            ]
+            for done, future in enumerate(asyncio.as_completed(tasks), 1):
+                index, result = await future
+                results[index] = result
+                logger.info(f"Обработано задач: {done}/{len(items)}")
+        return results
+
+    def run(self, items, func):
+        if not items:
+            return []
+        return asyncio.run(self.run_async(items, func))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SPEC_FIELDS = ("screen_size", "resolution", "camera_mp", "battery", "processor", "ram", "storage")
+
+SCREEN_SIZE_RE = re.compile(r"([\d.]+(?:–[\d.]+)?)(?=\s*дюйм)")
+RESOLUTION_RE = re.compile(r"(\d+)\s*[xх×]\s*(\d+)")
+INTEGER_RE = re.compile(r"\d+")
+TERABYTE_RE = re.compile(r"\d+\s*(?:тб|tb)\b", re.IGNORECASE)
+
+MATCH_CACHE_SIZE = 10000
+
+
+def normalize_screen_size(value):
+    match = SCREEN_SIZE_RE.search(value)
+    return float(match.group(1).split("–")[0]) if match else None
+
+
+def normalize_resolution(value):
+    match = RESOLUTION_RE.search(value)
+    return f"{match.group(1)}x{match.group(2)}" if match else value
+
+
+def normalize_integer(value):
+    match = INTEGER_RE.search(value)
+    return int(match.group()) if match else None
+
+
+def normalize_memory_gb(value):
+    match = INTEGER_RE.search(value)
+    if not match:
+        return None
+    amount = int(match.group())
+    return amount * 1024 if TERABYTE_RE.search(value) else amount
+
+
+def normalize_text(value):
+    return value.strip()
+
+
+SPEC_NORMALIZERS = {
+    "screen_size": normalize_screen_size,
+    "resolution": normalize_resolution,
+    "camera_mp": normalize_integer,
+    "battery": normalize_integer,
+    "processor": normalize_text,
+    "ram": normalize_memory_gb,
+    "storage": normalize_memory_gb,
+}
+
+
+class SpecMatcher:
+    # Автомат Ахо–Корасик по ключам маппинга: для названия характеристики
+    # выбирается самый длинный ключ, входящий в него подстрокой
+    def __init__(self, mapping, normalizers=None):
+        self.mapping = dict(mapping)
+        self.normalizers = normalizers or SPEC_NORMALIZERS
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]
+        self.cache = {}
+        for pattern in self.mapping:
+            self._add(pattern)
+        self._build_links()
+
+    def _add(self, pattern):
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.best.append(None)
+            node = next_node
+        self.best[node] = pattern
+
+    def _build_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                fallback = self.goto[state].get(char, 0)
+                self.fail[child] = fallback if fallback != child else 0
+                inherited = self.best[self.fail[child]]
+                if inherited and (not self.best[child] or len(inherited) > len(self.best[child])):
+                    self.best[child] = inherited
+
+    def longest_match(self, text):
+        node = 0
+        best = None
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            found = self.best[node]
+            if found and (best is None or len(found) > len(best)):
+                best = found
+        return best
+
+    def field_for(self, key):
+        field = self.cache.get(key, False)
+        if field is False:
+            pattern = self.longest_match(key)
+            field = self.mapping[pattern] if pattern else None
+            if len(self.cache) >= MATCH_CACHE_SIZE:
+                self.cache.clear()
+            self.cache[key] = field
+        return field
+
+    def normalize(self, raw_specs):
+        specs = dict.fromkeys(SPEC_FIELDS)
+        for key, value in raw_specs.items():
+            field = self.field_for(key)
+            if field is None or field not in specs:
+                continue
+            try:
+                specs[field] = self.normalizers[field](value)
+            except Exception as e:
+                logger.warning(f"Ошибка преобразования {key}={value}: {e}")
+        return specs
+
+    def normalize_batch(self, raw_specs_list):
+        return [self.normalize(raw_specs) for raw_specs in raw_specs_list]